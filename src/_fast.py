@@ -0,0 +1,71 @@
+import math
+import numpy as np
+from numba import njit, prange
+
+EARTH_RADIUS_KM = 6371.0
+
+# Above this many rows the distance matrix is filled with one thread per row block
+PARALLEL_THRESHOLD = 2000
+
+@njit(cache=True, fastmath=True)
+def _haversine(lat1, lon1, lat2, lon2):
+    """Haversine distance in km between two points given in radians"""
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * EARTH_RADIUS_KM
+
+@njit(cache=True, fastmath=True)
+def _haversine_row(lat1, lon1, lats_b, lons_b, out_row):
+    """Fill one matrix row: distances from (lat1, lon1) in radians to every b point in degrees"""
+    for j in range(lats_b.shape[0]):
+        out_row[j] = _haversine(lat1, lon1, math.radians(lats_b[j]), math.radians(lons_b[j]))
+
+# Separate serial and parallel functions: numba's on-disk cache is keyed by the Python
+# function, so one kernel compiled twice would let either build serve both entry points
+@njit(cache=True, fastmath=True)
+def _haversine_matrix_serial(lats_a, lons_a, lats_b, lons_b):
+    """Fill the (len(a), len(b)) Haversine matrix on one thread; coordinates in degrees"""
+    out = np.empty((lats_a.shape[0], lats_b.shape[0]), dtype=np.float64)
+    for i in range(lats_a.shape[0]):
+        _haversine_row(math.radians(lats_a[i]), math.radians(lons_a[i]), lats_b, lons_b, out[i])
+    return out
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _haversine_matrix_parallel(lats_a, lons_a, lats_b, lons_b):
+    """Fill the (len(a), len(b)) Haversine matrix with one thread per row block; coordinates in degrees"""
+    out = np.empty((lats_a.shape[0], lats_b.shape[0]), dtype=np.float64)
+    for i in prange(lats_a.shape[0]):
+        _haversine_row(math.radians(lats_a[i]), math.radians(lons_a[i]), lats_b, lons_b, out[i])
+    return out
+
+def haversine_matrix(lats_a: np.ndarray, lons_a: np.ndarray, lats_b: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """Haversine distances (km) between every point of a and every point of b"""
+    if lats_a.shape[0] >= PARALLEL_THRESHOLD:
+        return _haversine_matrix_parallel(lats_a, lons_a, lats_b, lons_b)
+    return _haversine_matrix_serial(lats_a, lons_a, lats_b, lons_b)
+
+@njit(cache=True, fastmath=True)
+def nn_route(depot_dist, local_dist):
+    """Greedy nearest-neighbor order and round-trip km; depot legs from depot_dist, stop-to-stop legs from local_dist"""
+    n = depot_dist.shape[0]
+    visited = np.zeros(n, dtype=np.bool_)
+    route = np.empty(n, dtype=np.int64)
+    
+    total = 0.0
+    current = -1
+    for step in range(n):
+        best, best_dist = -1, np.inf
+        for j in range(n):
+            if not visited[j]:
+                d = depot_dist[j] if current < 0 else local_dist[current, j]
+                if d < best_dist:
+                    best, best_dist = j, d
+        
+        route[step] = best
+        visited[best] = True
+        current = best
+        total += best_dist
+    
+    if n > 0:
+        total += depot_dist[current]  # back to the depot
+    
+    return route, total
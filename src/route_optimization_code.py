@@ -1,10 +1,170 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 import math
+import functools
 import random
+from itertools import chain
+import multiprocessing as mp
+import numba as nb
+
+@functools.lru_cache(maxsize=4096)
+def _haversine(loc1: Tuple[float, float], loc2: Tuple[float, float]) -> float:
+    """Haversine distance (km) between two (lat, lng) tuples, memoized on the coordinates"""
+    lat1, lon1 = loc1
+    lat2, lon2 = loc2
+    
+    # Convert to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    r = 6371  # Earth's radius in kilometers
+    
+    return c * r
+
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def _haversine_matrix(coords_rad):
+    """Pairwise Haversine distances (km) between rows of an (n, 2) radian lat/lon array"""
+    assert coords_rad.shape[1] == 2  # Fixed inner dimension lets LLVM vectorize
+    n = coords_rad.shape[0]
+    r = 6371.0  # Earth's radius in kilometers
+    out = np.zeros((n, n), dtype=coords_rad.dtype)  # Same precision as the input coordinates
+    
+    # Per-point trig hoisted out of the pair loop: 5n trig calls instead of ~4n^2.
+    # sin((x_j - x_i)/2) expands to sin(x_j/2)cos(x_i/2) - cos(x_j/2)sin(x_i/2); the expansion
+    # cancels badly for nearby points, so the hoisted terms are kept in float64.
+    lat = coords_rad[:, 0].astype(np.float64)
+    lon = coords_rad[:, 1].astype(np.float64)
+    sin_half_lat = np.sin(lat / 2)
+    cos_half_lat = np.cos(lat / 2)
+    sin_half_lon = np.sin(lon / 2)
+    cos_half_lon = np.cos(lon / 2)
+    cos_lat = np.cos(lat)
+    
+    # Haversine is symmetric: compute the strict upper triangle and mirror it (diagonal stays 0)
+    for i in nb.prange(n):
+        for j in range(i + 1, n):
+            sin_half_dlat = sin_half_lat[j] * cos_half_lat[i] - cos_half_lat[j] * sin_half_lat[i]
+            sin_half_dlon = sin_half_lon[j] * cos_half_lon[i] - cos_half_lon[j] * sin_half_lon[i]
+            a = min(sin_half_dlat**2 + cos_lat[i] * cos_lat[j] * sin_half_dlon**2, 1.0)
+            d = 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+            out[i, j] = d
+            out[j, i] = d
+    
+    return out
+
+@nb.njit(cache=True, fastmath=True, nogil=True)
+def _route_cost(distance_matrix, route, tw_lo, tw_hi, service):
+    """Distance plus lateness penalty for one route of location indices (depot is 0)"""
+    total_distance = 0.0
+    time_penalty = 0.0
+    current_time = 0.0
+    
+    for k in range(len(route) - 1):
+        from_idx = route[k]
+        to_idx = route[k + 1]
+        
+        distance = distance_matrix[from_idx, to_idx]
+        total_distance += distance
+        
+        if to_idx != 0:  # Not returning to depot
+            current_time += distance * 2  # 2 minutes per km
+            
+            if current_time < tw_lo[to_idx]:
+                current_time = tw_lo[to_idx]  # Wait
+            elif current_time > tw_hi[to_idx]:
+                time_penalty += (current_time - tw_hi[to_idx]) * 10  # Penalty for lateness
+            
+            current_time += service[to_idx]
+    
+    return total_distance + time_penalty
+
+@nb.njit(cache=True, nogil=True)
+def _split_tour(tour, distance_matrix, demand, service, tw_lo, tw_hi, capacity):
+    """Greedily cut a giant tour into capacity/time-window feasible routes; returns route start offsets"""
+    starts = np.empty(len(tour), dtype=np.int32)
+    num_routes = 0
+    current_location = 0
+    current_capacity = 0
+    current_time = 0.0
+    
+    for k in range(len(tour)):
+        customer = tour[k]
+        arrival_time = current_time + distance_matrix[current_location, customer] * 2
+        
+        # Open a new route when the customer no longer fits the current vehicle
+        if k == 0 or current_capacity + demand[customer] > capacity or arrival_time > tw_hi[customer]:
+            starts[num_routes] = k
+            num_routes += 1
+            current_capacity = 0
+            arrival_time = distance_matrix[0, customer] * 2
+        
+        current_capacity += demand[customer]
+        current_time = max(arrival_time, float(tw_lo[customer])) + service[customer]
+        current_location = customer
+    
+    return starts[:num_routes]
+
+@nb.njit(cache=True, fastmath=True, nogil=True)
+def _tour_cost(tour, distance_matrix, demand, service, tw_lo, tw_hi, capacity):
+    """Total cost of the routes obtained by splitting a giant tour"""
+    starts = _split_tour(tour, distance_matrix, demand, service, tw_lo, tw_hi, capacity)
+    route = np.zeros(len(tour) + 2, dtype=tour.dtype)  # Depot at both ends
+    total_cost = 0.0
+    
+    for r in range(len(starts)):
+        begin = starts[r]
+        end = starts[r + 1] if r + 1 < len(starts) else len(tour)
+        length = end - begin
+        route[1:length + 1] = tour[begin:end]
+        route[length + 1] = 0
+        total_cost += _route_cost(distance_matrix, route[:length + 2], tw_lo, tw_hi, service)
+    
+    return total_cost
+
+@nb.njit(cache=True, fastmath=True)
+def _two_opt_route(distance_matrix, route):
+    """Best-improvement 2-opt on a depot-to-depot route (distance only), in place"""
+    n = len(route)
+    improved = True
+    
+    while improved:
+        improved = False
+        best_gain = -1e-6  # Ignore float32 rounding noise so the loop terminates
+        best_i = 0
+        best_j = 0
+        
+        for i in range(n - 3):
+            for j in range(i + 2, n - 1):
+                # Replace edges (i, i+1) and (j, j+1) with (i, j) and (i+1, j+1)
+                gain = (distance_matrix[route[i], route[j]] + distance_matrix[route[i + 1], route[j + 1]]
+                        - distance_matrix[route[i], route[i + 1]] - distance_matrix[route[j], route[j + 1]])
+                if gain < best_gain:
+                    best_gain = gain
+                    best_i = i
+                    best_j = j
+        
+        if best_gain < -1e-6:
+            route[best_i + 1:best_j + 1] = route[best_i + 1:best_j + 1][::-1].copy()
+            improved = True
+    
+    return route
+
+# Problem arrays for GA worker processes, set once per worker by _init_worker
+_worker_problem = None
+
+def _init_worker(distance_matrix, demand, service, tw_lo, tw_hi, capacity):
+    """Pool initializer: keep the problem arrays in the worker so only tours are sent per task"""
+    global _worker_problem
+    _worker_problem = (distance_matrix, demand, service, tw_lo, tw_hi, capacity)
+
+def _evaluate_tour(tour):
+    """Pool task: cost of one giant tour against the worker's problem arrays"""
+    return _tour_cost(tour, *_worker_problem)
 
 class DeliveryOptimizer:
     """
@@ -35,85 +195,70 @@ class DeliveryOptimizer:
     
     def calculate_distance(self, loc1: Tuple[float, float], loc2: Tuple[float, float]) -> float:
         """Calculate Haversine distance between two coordinates"""
-        lat1, lon1 = loc1
-        lat2, lon2 = loc2
-        
-        # Convert to radians
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Earth's radius in kilometers
-        
-        return c * r
+        return _haversine(tuple(loc1), tuple(loc2))
+    
+    def distance(self, i: int, j: int) -> float:
+        """Distance in km between two location indices (depot is 0), from the precomputed matrix"""
+        if self.distance_matrix is None:
+            self.build_distance_matrix()
+        return float(self.distance_matrix[i, j])
     
     def build_distance_matrix(self):
         """Build distance matrix for all locations including depot"""
-        all_locations = [self.depot] + [c['location'] for c in self.customers]
-        n = len(all_locations)
-        self.distance_matrix = np.zeros((n, n))
+        coords = np.radians(np.array([self.depot] + [c['location'] for c in self.customers]))
+        coords = coords.astype(np.float32)  # km-scale distances need no more; halves memory traffic
+        n = len(coords)
         
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    self.distance_matrix[i][j] = self.calculate_distance(
-                        all_locations[i], all_locations[j]
-                    )
+        self.distance_matrix = _haversine_matrix(coords)
+        
+        # Structure-of-arrays view of the customers, aligned with the matrix (depot at index 0)
+        self._demand = np.fromiter(chain((0,), (c['demand'] for c in self.customers)), dtype=np.int32, count=n)
+        self._service = np.fromiter(chain((0,), (c['service_time'] for c in self.customers)), dtype=np.int32, count=n)
+        self._tw_lo = np.fromiter(chain((0,), (c['time_window'][0] for c in self.customers)), dtype=np.int32, count=n)
+        self._tw_hi = np.fromiter(chain((0,), (c['time_window'][1] for c in self.customers)), dtype=np.int32, count=n)
     
     def nearest_neighbor_heuristic(self) -> List[List[int]]:
         """Nearest Neighbor algorithm for initial route construction"""
-        unvisited = list(range(1, len(self.customers) + 1))  # Customer indices (depot is 0)
+        unvisited = np.ones(len(self.customers) + 1, dtype=bool)  # Customer indices (depot is 0)
+        unvisited[0] = False
         routes = []
         
-        while unvisited:
+        while unvisited.any():
             route = [0]  # Start from depot
             current_location = 0
             current_capacity = 0
             current_time = 0
             
-            while unvisited:
+            while unvisited.any():
                 # Find nearest unvisited customer that fits constraints
-                best_customer = None
-                min_distance = float('inf')
+                candidates = np.flatnonzero(unvisited)
+                distances = self.distance_matrix[current_location, candidates]
                 
-                for customer_idx in unvisited:
-                    customer = self.customers[customer_idx - 1]
-                    
-                    # Check capacity constraint
-                    if current_capacity + customer['demand'] > self.vehicle_capacity:
-                        continue
-                    
-                    # Check time window constraint
-                    travel_time = self.distance_matrix[current_location][customer_idx] * 2  # Assume 2 min per km
-                    arrival_time = current_time + travel_time
-                    
-                    if arrival_time > customer['time_window'][1]:  # Too late
-                        continue
-                    
-                    # Calculate distance
-                    distance = self.distance_matrix[current_location][customer_idx]
-                    
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_customer = customer_idx
+                fits_capacity = current_capacity + self._demand[candidates] <= self.vehicle_capacity
+                arrival_times = current_time + distances * 2  # Assume 2 min per km
+                in_time = arrival_times <= self._tw_hi[candidates]
+                feasible = fits_capacity & in_time
                 
-                if best_customer is None:
+                if feasible.any():
+                    best_customer = int(candidates[feasible][np.argmin(distances[feasible])])
+                elif len(route) > 1:
                     break  # No more customers can be added to this route
+                else:
+                    # Nothing fits even an empty vehicle - serve the nearest customer late
+                    # (penalised in calculate_route_cost) so construction terminates
+                    best_customer = int(candidates[np.argmin(distances)])
                 
                 # Add customer to route
                 route.append(best_customer)
-                unvisited.remove(best_customer)
-                current_location = best_customer
-                current_capacity += self.customers[best_customer - 1]['demand']
+                unvisited[best_customer] = False
+                current_capacity += self._demand[best_customer]
                 
                 # Update time
-                travel_time = min_distance * 2
+                travel_time = self.distance_matrix[current_location, best_customer] * 2
                 arrival_time = current_time + travel_time
-                service_start = max(arrival_time, self.customers[best_customer - 1]['time_window'][0])
-                current_time = service_start + self.customers[best_customer - 1]['service_time']
+                service_start = max(arrival_time, self._tw_lo[best_customer])
+                current_time = service_start + self._service[best_customer]
+                current_location = best_customer
             
             route.append(0)  # Return to depot
             routes.append(route)
@@ -122,105 +267,134 @@ class DeliveryOptimizer:
     
     def calculate_route_cost(self, route: List[int]) -> float:
         """Calculate total cost (distance + time penalty) for a route"""
-        total_distance = 0
-        time_penalty = 0
-        current_time = 0
-        
-        for i in range(len(route) - 1):
-            from_idx = route[i]
-            to_idx = route[i + 1]
-            
-            # Add travel distance
-            distance = self.distance_matrix[from_idx][to_idx]
-            total_distance += distance
-            
-            # Update time and calculate penalties
-            if to_idx != 0:  # Not returning to depot
-                travel_time = distance * 2  # 2 minutes per km
-                current_time += travel_time
-                
-                customer = self.customers[to_idx - 1]
-                earliest, latest = customer['time_window']
-                
-                if current_time < earliest:
-                    current_time = earliest  # Wait
-                elif current_time > latest:
-                    time_penalty += (current_time - latest) * 10  # Penalty for lateness
-                
-                current_time += customer['service_time']
-        
-        return total_distance + time_penalty
+        return float(_route_cost(self.distance_matrix, np.asarray(route, dtype=np.int32),
+                                 self._tw_lo, self._tw_hi, self._service))
+    
+    def _split(self, tour: np.ndarray) -> List[List[int]]:
+        """Split a giant tour (customer permutation) into depot-to-depot routes"""
+        starts = _split_tour(tour, self.distance_matrix, self._demand, self._service,
+                             self._tw_lo, self._tw_hi, self.vehicle_capacity)
+        bounds = starts.tolist() + [len(tour)]
+        return [[0] + tour[begin:end].tolist() + [0] for begin, end in zip(bounds[:-1], bounds[1:])]
     
-    def optimize_with_genetic_algorithm(self, generations: int = 100, population_size: int = 50):
-        """Genetic Algorithm for route optimization"""
-        if not self.distance_matrix.any():
+    def _evaluate_individual(self, individual: np.ndarray) -> float:
+        """Total cost of the routes an individual's giant tour splits into"""
+        return float(_tour_cost(individual, self.distance_matrix, self._demand, self._service,
+                                self._tw_lo, self._tw_hi, self.vehicle_capacity))
+    
+    def optimize_with_genetic_algorithm(self, generations: int = 100, population_size: int = 50,
+                                        local_search_rate: float = 0.2, processes: Optional[int] = 1):
+        """Genetic Algorithm for route optimization (processes > 1, or None for every CPU, evaluates fitness in a worker pool)"""
+        if self.distance_matrix is None:
             self.build_distance_matrix()
         
-        # Generate initial population
-        population = []
-        for _ in range(population_size):
-            routes = self.nearest_neighbor_heuristic()
-            population.append(routes)
+        # Individuals are giant tours: one permutation of all customers, split into routes on evaluation.
+        # Seed from one (deterministic) nearest neighbor solution, kept unchanged as an elite,
+        # and perturbed copies of it for diversity
+        base = np.array([idx for route in self.nearest_neighbor_heuristic() for idx in route if idx != 0],
+                        dtype=np.int32)
+        population = [base] + [self._perturb(base.copy()) for _ in range(population_size - 1)]
         
         best_solution = None
         best_cost = float('inf')
         
-        for generation in range(generations):
-            # Evaluate fitness
-            fitness_scores = []
-            for individual in population:
-                total_cost = sum(self.calculate_route_cost(route) for route in individual)
-                fitness_scores.append(1 / (1 + total_cost))  # Higher fitness for lower cost
+        pool = None
+        if processes != 1:
+            # Opt-in: pickling populations to workers only pays off for large instances.
+            # Spawned (not forked) workers: the compiled kernels' threading layer is not fork-safe
+            pool = mp.get_context("spawn").Pool(processes, initializer=_init_worker, initargs=(
+                self.distance_matrix, self._demand, self._service,
+                self._tw_lo, self._tw_hi, self.vehicle_capacity
+            ))
+        
+        try:
+            for generation in range(generations):
+                # Evaluate fitness across worker processes
+                if pool is not None:
+                    costs = np.array(pool.map(_evaluate_tour, population))
+                else:
+                    costs = np.array([self._evaluate_individual(individual) for individual in population])
+                fitness_scores = 1 / (1 + costs)  # Higher fitness for lower cost
                 
-                if total_cost < best_cost:
-                    best_cost = total_cost
-                    best_solution = individual.copy()
-            
-            # Selection and crossover
-            new_population = []
-            for _ in range(population_size):
-                # Tournament selection
-                parent1 = self.tournament_selection(population, fitness_scores)
-                parent2 = self.tournament_selection(population, fitness_scores)
+                # Track the incumbent, copying only when it actually improves
+                best_idx = int(costs.argmin())
+                if costs[best_idx] < best_cost:
+                    best_cost = float(costs[best_idx])
+                    best_solution = self._split(population[best_idx])
                 
-                # Crossover and mutation
-                child = self.crossover(parent1, parent2)
-                child = self.mutate(child)
-                new_population.append(child)
-            
-            population = new_population
+                # Elitism: carry the generation's best over; copied because mutation works in place
+                new_population = [population[best_idx].copy()]
+                
+                # Selection and crossover: all tournaments for the generation drawn in one batch
+                parents = self._batch_tournament_selection(fitness_scores, 2 * (population_size - 1))
+                for parent1_idx, parent2_idx in zip(parents[0::2], parents[1::2]):
+                    # Crossover and mutation
+                    child = self.crossover(population[parent1_idx], population[parent2_idx])
+                    child = self.mutate(child)
+                
+                    # Memetic step: polish some children with 2-opt before evaluation
+                    if random.random() < local_search_rate:
+                        child = self._local_search(child)
+                    new_population.append(child)
+                
+                population = new_population
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
         
         self.optimized_routes = best_solution
         return best_solution, best_cost
     
-    def tournament_selection(self, population, fitness_scores, tournament_size=3):
-        """Tournament selection for genetic algorithm"""
-        tournament_indices = random.sample(range(len(population)), tournament_size)
-        best_idx = max(tournament_indices, key=lambda i: fitness_scores[i])
-        return population[best_idx]
-    
-    def crossover(self, parent1, parent2):
-        """Order crossover for route optimization"""
-        # Simplified crossover - in practice, this would be more sophisticated
-        if random.random() < 0.8:  # Crossover probability
-            # Select random route from each parent
-            if parent1 and parent2:
-                route1 = random.choice(parent1)
-                route2 = random.choice(parent2)
-                # Simple combination
-                return [route1, route2]
-        return parent1.copy()
-    
-    def mutate(self, individual, mutation_rate=0.1):
+    def _perturb(self, individual: np.ndarray, num_swaps=3) -> np.ndarray:
+        """Randomly swap customers in a giant tour"""
+        if len(individual) < 2:
+            return individual
+        
+        for _ in range(num_swaps):
+            i, j = random.sample(range(len(individual)), 2)
+            individual[i], individual[j] = individual[j], individual[i]
+        
+        return individual
+    
+    def _batch_tournament_selection(self, fitness_scores: np.ndarray, num_winners: int,
+                                    tournament_size=3) -> np.ndarray:
+        """Run num_winners tournaments at once and return the winning population indices"""
+        contenders = np.random.randint(0, len(fitness_scores), size=(num_winners, tournament_size))
+        best = fitness_scores[contenders].argmax(axis=1)
+        return contenders[np.arange(num_winners), best]
+    
+    def crossover(self, parent1: np.ndarray, parent2: np.ndarray) -> np.ndarray:
+        """Order crossover (OX) of two giant tours"""
+        if len(parent1) < 2 or random.random() >= 0.8:  # Crossover probability
+            return parent1.copy()
+        
+        # Keep a random slice of parent1 in place, fill the rest in parent2's order
+        i, j = sorted(random.sample(range(len(parent1) + 1), 2))
+        child = np.empty_like(parent1)
+        child[i:j] = parent1[i:j]
+        remainder = parent2[~np.isin(parent2, parent1[i:j])]
+        child[:i] = remainder[:i]
+        child[j:] = remainder[i:]
+        return child
+    
+    def mutate(self, individual: np.ndarray, mutation_rate=0.1) -> np.ndarray:
         """Mutation operator for genetic algorithm"""
-        if random.random() < mutation_rate:
-            for route in individual:
-                if len(route) > 3:  # Has customers (not just depot-depot)
-                    # Swap two customers in the route
-                    i, j = random.sample(range(1, len(route)-1), 2)
-                    route[i], route[j] = route[j], route[i]
+        if len(individual) > 1 and random.random() < mutation_rate:
+            # 2-opt move: reverse a random segment of the tour
+            i, j = sorted(random.sample(range(len(individual) + 1), 2))
+            individual[i:j] = individual[i:j][::-1].copy()
         return individual
     
+    def _two_opt(self, route: List[int]) -> List[int]:
+        """Improve a single route's distance with 2-opt moves"""
+        return _two_opt_route(self.distance_matrix, np.asarray(route, dtype=np.int32)).tolist()
+    
+    def _local_search(self, individual: np.ndarray) -> np.ndarray:
+        """Apply 2-opt to every route of a giant tour and join the routes back together"""
+        routes = [self._two_opt(route) for route in self._split(individual)]
+        return np.array([idx for route in routes for idx in route if idx != 0], dtype=np.int32)
+    
     def generate_delivery_schedule(self) -> Dict:
         """Generate detailed delivery schedule with times and instructions"""
         if not self.optimized_routes:
@@ -236,6 +410,8 @@ class DeliveryOptimizer:
             }
         }
         
+        base_time = pd.Timestamp('08:00')  # Today at 08:00
+        
         for route_idx, route in enumerate(self.optimized_routes):
             route_info = {
                 'route_id': f"ROUTE_{route_idx + 1}",
@@ -246,7 +422,16 @@ class DeliveryOptimizer:
                 'estimated_duration': 0
             }
             
-            current_time = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+            # Minutes after 08:00 for every stop: service at each stop plus travel to the next
+            route_arr = np.asarray(route, dtype=np.int32)
+            service_time = self._service[route_arr].astype(np.float64)  # Zero at the depot
+            travel_time = np.append(self.distance_matrix[route_arr[:-1], route_arr[1:]] * 2.0, 0)
+            arrival_min = np.concatenate(([0.0], np.cumsum(service_time + travel_time)[:-1]))
+            departure_min = arrival_min + np.where(route_arr == 0, 15, service_time)
+            
+            # Format all times at once
+            arrival_times = (base_time + pd.to_timedelta(arrival_min, unit='m')).strftime("%H:%M")
+            departure_times = (base_time + pd.to_timedelta(departure_min, unit='m')).strftime("%H:%M")
             
             for i, location_idx in enumerate(route):
                 if location_idx == 0:  # Depot
@@ -255,36 +440,30 @@ class DeliveryOptimizer:
                         'location': 'DEPOT',
                         'address': 'Distribution Center',
                         'coordinates': self.depot,
-                        'arrival_time': current_time.strftime("%H:%M"),
-                        'departure_time': (current_time + timedelta(minutes=15)).strftime("%H:%M"),
+                        'arrival_time': arrival_times[i],
+                        'departure_time': departure_times[i],
                         'activity': 'Load/Unload' if i == 0 else 'Return'
                     }
                 else:  # Customer
                     customer = self.customers[location_idx - 1]
-                    route_info['total_demand'] += customer['demand']
+                    demand = int(self._demand[location_idx])
+                    route_info['total_demand'] += demand
                     
                     stop_info = {
                         'stop_number': i,
                         'customer_id': customer['id'],
                         'address': f"Customer {customer['id']} Location",
                         'coordinates': customer['location'],
-                        'arrival_time': current_time.strftime("%H:%M"),
-                        'departure_time': (current_time + timedelta(minutes=customer['service_time'])).strftime("%H:%M"),
-                        'time_window': f"{customer['time_window'][0]:02d}:00 - {customer['time_window'][1]:02d}:00",
-                        'demand': customer['demand'],
+                        'arrival_time': arrival_times[i],
+                        'departure_time': departure_times[i],
+                        'time_window': f"{self._tw_lo[location_idx]:02d}:00 - {self._tw_hi[location_idx]:02d}:00",
+                        'demand': demand,
                         'activity': 'Delivery'
                     }
-                    current_time += timedelta(minutes=customer['service_time'])
                 
                 route_info['stops'].append(stop_info)
-                
-                # Add travel time to next stop
-                if i < len(route) - 1:
-                    next_idx = route[i + 1]
-                    travel_time = self.distance_matrix[location_idx][next_idx] * 2
-                    current_time += timedelta(minutes=travel_time)
             
-            route_info['estimated_duration'] = (current_time - datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)).total_seconds() / 3600
+            route_info['estimated_duration'] = (arrival_min[-1] + service_time[-1]) / 60
             schedule['routes'].append(route_info)
             schedule['summary']['total_distance'] += route_info['total_distance']
         
@@ -296,23 +475,35 @@ class DeliveryOptimizer:
         """Export routes to GPS-compatible CSV format"""
         schedule = self.generate_delivery_schedule()
         
-        gps_data = []
+        # Build typed columns directly instead of a list of per-row dicts
+        route_ids, vehicle_ids, stop_numbers, customer_ids = [], [], [], []
+        latitudes, longitudes, arrival_times, departure_times, activities, demands = [], [], [], [], [], []
+        
         for route in schedule['routes']:
             for stop in route['stops']:
-                gps_data.append({
-                    'Route_ID': route['route_id'],
-                    'Vehicle_ID': route['vehicle_id'],
-                    'Stop_Number': stop['stop_number'],
-                    'Customer_ID': stop.get('customer_id', 'DEPOT'),
-                    'Latitude': stop['coordinates'][0],
-                    'Longitude': stop['coordinates'][1],
-                    'Arrival_Time': stop['arrival_time'],
-                    'Departure_Time': stop['departure_time'],
-                    'Activity': stop['activity'],
-                    'Demand': stop.get('demand', 0)
-                })
+                route_ids.append(route['route_id'])
+                vehicle_ids.append(route['vehicle_id'])
+                stop_numbers.append(stop['stop_number'])
+                customer_ids.append(stop.get('customer_id', 'DEPOT'))
+                latitudes.append(stop['coordinates'][0])
+                longitudes.append(stop['coordinates'][1])
+                arrival_times.append(stop['arrival_time'])
+                departure_times.append(stop['departure_time'])
+                activities.append(stop['activity'])
+                demands.append(stop.get('demand', 0))
         
-        df = pd.DataFrame(gps_data)
+        df = pd.DataFrame({
+            'Route_ID': route_ids,
+            'Vehicle_ID': vehicle_ids,
+            'Stop_Number': np.asarray(stop_numbers, dtype=np.int32),
+            'Customer_ID': customer_ids,
+            'Latitude': np.asarray(latitudes, dtype=np.float64),
+            'Longitude': np.asarray(longitudes, dtype=np.float64),
+            'Arrival_Time': arrival_times,
+            'Departure_Time': departure_times,
+            'Activity': activities,
+            'Demand': np.asarray(demands, dtype=np.int32)
+        })
         df.to_csv(filename, index=False)
         print(f"Routes exported to {filename}")
         
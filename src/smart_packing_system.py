@@ -1,11 +1,32 @@
+import io
 import json
 import math
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, IntFlag
 import heapq
-from collections import defaultdict
+import numpy as np
+
+try:
+    from cHaversine import haversine as _c_haversine  # C implementation, returns meters
+except ImportError:
+    _c_haversine = None
+
+try:
+    from sklearn.cluster import MiniBatchKMeans
+except ImportError:
+    MiniBatchKMeans = None
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+try:
+    import _fast  # Numba-compiled distance and routing kernels
+except ImportError:
+    _fast = None
 
 class Priority(Enum):
     """Order priority levels"""
@@ -21,6 +42,51 @@ class PackageSize(Enum):
     LARGE = "large"     # 5-20 kg, 60-100cm
     EXTRA_LARGE = "xl"  # > 20 kg, > 100cm
 
+class HandlingFlag(IntFlag):
+    """Special handling requirements, packed into one small integer per order"""
+    FRAGILE = 1
+    TEMPERATURE_SENSITIVE = 2
+    HAZARDOUS = 4
+
+# Vehicle equipment that satisfies each handling requirement
+EQUIPMENT_FLAGS = {
+    "fragile_handling": HandlingFlag.FRAGILE,
+    "refrigeration": HandlingFlag.TEMPERATURE_SENSITIVE,
+    "hazardous_handling": HandlingFlag.HAZARDOUS,
+}
+
+# Extra package-level bits used only for handling instructions
+HEAVY_FLAG = 8        # > 20 kg
+OVERSIZED_FLAG = 16   # any side > 100 cm
+
+def _build_handling_table() -> Dict[int, Tuple[str, ...]]:
+    """Handling instructions for every combination of package flag bits"""
+    labels = [
+        (HandlingFlag.FRAGILE, "FRAGILE - Handle with care"),
+        (HandlingFlag.TEMPERATURE_SENSITIVE, "TEMPERATURE SENSITIVE - Keep cool"),
+        (HandlingFlag.HAZARDOUS, "HAZARDOUS - Follow safety protocols"),
+        (HEAVY_FLAG, "HEAVY - Use proper lifting technique"),
+        (OVERSIZED_FLAG, "OVERSIZED - May require team lift"),
+    ]
+    return {mask: tuple(text for bit, text in labels if mask & bit) for mask in range(32)}
+
+def _build_special_note_table() -> Dict[int, str]:
+    """Order-level special handling note for every combination of HandlingFlag bits"""
+    labels = [
+        (HandlingFlag.FRAGILE, "Contains fragile items"),
+        (HandlingFlag.TEMPERATURE_SENSITIVE, "Requires temperature control"),
+        (HandlingFlag.HAZARDOUS, "Contains hazardous materials"),
+    ]
+    return {mask: "; ".join(text for bit, text in labels if mask & bit) for mask in range(8)}
+
+_HANDLING_TABLE = _build_handling_table()
+_SPECIAL_NOTE_TABLE = _build_special_note_table()
+
+def _equirectangular_km(dlat, dlon, coslat0: float):
+    """Flat-earth distance (km) for degree offsets, accurate within a cluster; coslat0 is cos of the mean latitude"""
+    dx = dlon * coslat0
+    return np.radians(np.sqrt(dx * dx + dlat * dlat)) * 6371  # Earth's radius in kilometers
+
 @dataclass
 class Package:
     """Package information"""
@@ -33,15 +99,23 @@ class Package:
     hazardous: bool = False
     value: float = 0.0  # package value for insurance
     
+    def __post_init__(self):
+        # Packages don't change after construction, so derived values are computed once
+        self._volume = self.dimensions[0] * self.dimensions[1] * self.dimensions[2]
+        self._max_dim = max(self.dimensions)
+        self._flags = ((HandlingFlag.FRAGILE if self.fragile else 0) |
+                       (HandlingFlag.TEMPERATURE_SENSITIVE if self.temperature_sensitive else 0) |
+                       (HandlingFlag.HAZARDOUS if self.hazardous else 0))
+    
     @property
     def volume(self) -> float:
         """Calculate package volume in cubic cm"""
-        return self.dimensions[0] * self.dimensions[1] * self.dimensions[2]
+        return self._volume
     
     @property
     def size_category(self) -> PackageSize:
         """Determine package size category"""
-        max_dimension = max(self.dimensions)
+        max_dimension = self._max_dim
         if self.weight < 1 and max_dimension < 30:
             return PackageSize.SMALL
         elif self.weight < 5 and max_dimension < 60:
@@ -63,21 +137,32 @@ class DeliveryOrder:
     packages: List[Package]
     special_instructions: str = ""
     
+    def __post_init__(self):
+        # Package contents are fixed once the order is created, so aggregate them once
+        self._total_weight = sum(pkg.weight for pkg in self.packages)
+        self._total_volume = sum(pkg.volume for pkg in self.packages)
+        self._requires_special = any(pkg.fragile or pkg.temperature_sensitive or pkg.hazardous 
+                                     for pkg in self.packages)
+        
+        # Handling requirements of every package as HandlingFlag bits
+        self.req_mask = 0
+        for pkg in self.packages:
+            self.req_mask |= pkg._flags
+    
     @property
     def total_weight(self) -> float:
         """Total weight of all packages in the order"""
-        return sum(pkg.weight for pkg in self.packages)
+        return self._total_weight
     
     @property
     def total_volume(self) -> float:
         """Total volume of all packages in the order"""
-        return sum(pkg.volume for pkg in self.packages)
+        return self._total_volume
     
     @property
     def requires_special_handling(self) -> bool:
         """Check if order requires special handling"""
-        return any(pkg.fragile or pkg.temperature_sensitive or pkg.hazardous 
-                  for pkg in self.packages)
+        return self._requires_special
 
 @dataclass
 class Vehicle:
@@ -90,24 +175,18 @@ class Vehicle:
     available_from: datetime
     special_equipment: List[str]  # e.g., "refrigeration", "fragile_handling"
     
+    def __post_init__(self):
+        # Handling capabilities of the equipment as HandlingFlag bits
+        self.caps_mask = 0
+        for equipment in self.special_equipment:
+            self.caps_mask |= EQUIPMENT_FLAGS.get(equipment, 0)
+    
     def can_handle_order(self, order: DeliveryOrder) -> bool:
         """Check if vehicle can handle the order"""
-        if order.total_weight > self.capacity_weight:
-            return False
-        if order.total_volume > self.capacity_volume:
-            return False
-        
-        # Check special handling requirements
-        if order.requires_special_handling:
-            for pkg in order.packages:
-                if pkg.temperature_sensitive and "refrigeration" not in self.special_equipment:
-                    return False
-                if pkg.fragile and "fragile_handling" not in self.special_equipment:
-                    return False
-                if pkg.hazardous and "hazardous_handling" not in self.special_equipment:
-                    return False
-        
-        return True
+        # Every required handling bit must be covered by the vehicle's equipment
+        return (order.total_weight <= self.capacity_weight and
+                order.total_volume <= self.capacity_volume and
+                (order.req_mask & ~self.caps_mask) == 0)
 
 class SmartPackingSystem:
     """Intelligent packing and loading optimization system"""
@@ -118,9 +197,17 @@ class SmartPackingSystem:
         self.vehicles = []
         self.packing_plans = []
         
+        # Distance cache, rebuilt lazily whenever orders change; keyed by object identity
+        # so duplicate order_ids and orders never passed to add_order each get their own slot
+        self._cached_orders = []
+        self._order_pos = None
+        self._order_coords = None
+        self._d_depot = None
+        
     def add_order(self, order: DeliveryOrder):
         """Add a delivery order to the system"""
         self.orders.append(order)
+        self._order_pos = None
     
     def add_vehicle(self, vehicle: Vehicle):
         """Add a delivery vehicle to the system"""
@@ -128,6 +215,9 @@ class SmartPackingSystem:
     
     def calculate_distance(self, loc1: Tuple[float, float], loc2: Tuple[float, float]) -> float:
         """Calculate Haversine distance between two coordinates"""
+        if _c_haversine is not None:
+            return _c_haversine(loc1, loc2) / 1000.0
+        
         lat1, lon1 = loc1
         lat2, lon2 = loc2
         
@@ -143,42 +233,101 @@ class SmartPackingSystem:
         
         return c * r
     
+    def _haversine_matrix(self, coords1: np.ndarray, coords2: np.ndarray) -> np.ndarray:
+        """Haversine distances (km) between every (lat, lng) row of coords1 and of coords2"""
+        if _fast is not None:
+            return _fast.haversine_matrix(coords1[:, 0], coords1[:, 1], coords2[:, 0], coords2[:, 1])
+        
+        lat1, lon1 = np.radians(coords1[:, 0])[:, None], np.radians(coords1[:, 1])[:, None]
+        lat2, lon2 = np.radians(coords2[:, 0])[None, :], np.radians(coords2[:, 1])[None, :]
+        
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+        c = 2 * np.arcsin(np.sqrt(a))
+        r = 6371  # Earth's radius in kilometers
+        
+        return c * r
+    
+    def _cache_orders(self, orders: List[DeliveryOrder]):
+        """(Re)build the distance cache and per-order arrays over the given orders"""
+        self._cached_orders = list(orders)
+        self._order_pos = {id(order): i for i, order in enumerate(self._cached_orders)}
+        self._build_distance_cache()
+        self._materialize_arrays()
+    
+    def _build_distance_cache(self):
+        """Precompute order coordinates and depot-to-order distances for all cached orders"""
+        self._order_coords = np.array([order.customer_location for order in self._cached_orders], dtype=np.float64).reshape(-1, 2)
+        depot = np.array([self.depot_location], dtype=np.float64)
+        self._d_depot = self._haversine_matrix(depot, self._order_coords)[0]
+    
+    def _materialize_arrays(self):
+        """Build structure-of-arrays buffers of per-order attributes for bulk filtering"""
+        orders = self._cached_orders
+        n = len(orders)
+        self._weights = np.fromiter((order.total_weight for order in orders), dtype=np.float64, count=n)
+        self._volumes = np.fromiter((order.total_volume for order in orders), dtype=np.float64, count=n)
+        self._priorities = np.fromiter((order.priority.value for order in orders), dtype=np.int8, count=n)
+        self._deadlines = np.fromiter((order.time_window[1].timestamp() for order in orders), dtype=np.float64, count=n)
+        self._pkg_flags = np.fromiter((order.req_mask for order in orders), dtype=np.uint8, count=n)
+        
+        # Number of packages per order needing fragile/temperature/hazardous handling
+        self._handling_counts = np.fromiter(
+            (sum(1 for pkg in order.packages if pkg._flags) for order in orders),
+            dtype=np.int32, count=n
+        )
+    
+    def _compatibility_mask(self, vehicle: Vehicle) -> np.ndarray:
+        """Vectorized can_handle_order over every order in the system"""
+        return ((self._weights <= vehicle.capacity_weight) &
+                (self._volumes <= vehicle.capacity_volume) &
+                ((self._pkg_flags & ~np.uint8(vehicle.caps_mask)) == 0))
+    
+    def _order_indices(self, orders: List[DeliveryOrder]) -> np.ndarray:
+        """Positions of the given orders in the distance cache, adding any it does not hold yet"""
+        if self._order_pos is None:
+            self._cache_orders(self.orders)
+        
+        # Callers may pass orders that never went through add_order (or were appended to self.orders directly)
+        missing = {id(order): order for order in orders if id(order) not in self._order_pos}
+        if missing:
+            self._cache_orders(self._cached_orders + list(missing.values()))
+        return np.array([self._order_pos[id(order)] for order in orders], dtype=np.intp)
+    
     def create_geographical_clusters(self, orders: List[DeliveryOrder], max_cluster_size: int = 8) -> List[List[DeliveryOrder]]:
         """Create geographical clusters of orders for efficient routing"""
         if not orders:
             return []
         
+        if MiniBatchKMeans is not None:
+            return self._kmeans_clusters(orders, max_cluster_size)
+        
         clusters = []
-        remaining_orders = orders.copy()
+        positions = self._order_indices(orders)
+        unclustered = np.ones(len(orders), dtype=bool)
         
-        while remaining_orders:
-            # Start new cluster with the order closest to depot
-            distances_to_depot = [
-                (self.calculate_distance(self.depot_location, order.customer_location), order)
-                for order in remaining_orders
-            ]
-            distances_to_depot.sort()
+        while unclustered.any():
+            # Start new cluster with the order closest to depot (argmin, no full sort)
+            candidates = np.flatnonzero(unclustered)
+            seed = candidates[np.argmin(self._d_depot[positions[candidates]])]
             
-            cluster = [distances_to_depot[0][1]]
-            remaining_orders.remove(distances_to_depot[0][1])
+            cluster = [orders[seed]]
+            unclustered[seed] = False
             
             # Add nearby orders to the cluster
-            while len(cluster) < max_cluster_size and remaining_orders:
-                cluster_center = self._calculate_cluster_center(cluster)
-                
-                # Find closest order to cluster center
-                closest_order = None
-                min_distance = float('inf')
+            while len(cluster) < max_cluster_size and unclustered.any():
+                cluster_center = np.array([self._calculate_cluster_center(cluster)])
                 
-                for order in remaining_orders:
-                    distance = self.calculate_distance(cluster_center, order.customer_location)
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_order = order
+                # Find closest order to cluster center (one-to-many in a single call)
+                candidates = np.flatnonzero(unclustered)
+                distances = self._haversine_matrix(cluster_center, self._order_coords[positions[candidates]])[0]
+                closest = int(np.argmin(distances))
+                min_distance = distances[closest]
                 
-                if closest_order and min_distance < 10:  # Within 10km radius
-                    cluster.append(closest_order)
-                    remaining_orders.remove(closest_order)
+                if min_distance < 10:  # Within 10km radius
+                    cluster.append(orders[candidates[closest]])
+                    unclustered[candidates[closest]] = False
                 else:
                     break
             
@@ -186,6 +335,41 @@ class SmartPackingSystem:
         
         return clusters
     
+    def _kmeans_clusters(self, orders: List[DeliveryOrder], max_cluster_size: int) -> List[List[DeliveryOrder]]:
+        """Cluster orders with mini-batch k-means, splitting clusters larger than max_cluster_size"""
+        idx = self._order_indices(orders)
+        coords = self._order_coords[idx].astype(np.float32)
+        
+        # Scale longitude by cos(mean latitude) so Euclidean distance approximates Haversine locally
+        coords[:, 1] *= np.cos(np.radians(coords[:, 0].mean()))
+        
+        groups = self._split_cluster(np.arange(len(orders)), coords, max_cluster_size)
+        
+        # Clusters closest to the depot come first, as with the incremental builder
+        groups.sort(key=lambda group: self._d_depot[idx[group]].min())
+        return [[orders[i] for i in group] for group in groups]
+    
+    def _split_cluster(self, members: np.ndarray, coords: np.ndarray, max_cluster_size: int) -> List[np.ndarray]:
+        """Recursively k-means a set of order positions until every cluster fits max_cluster_size"""
+        n_clusters = math.ceil(len(members) / max_cluster_size)
+        if n_clusters <= 1:
+            return [members]
+        
+        labels = MiniBatchKMeans(
+            n_clusters=n_clusters, batch_size=256, n_init=3, random_state=0
+        ).fit_predict(coords[members])
+        
+        groups = []
+        for label in range(n_clusters):
+            group = members[labels == label]
+            if len(group) == len(members):
+                # Degenerate split (e.g. identical coordinates), fall back to fixed-size chunks
+                return [members[i:i + max_cluster_size] for i in range(0, len(members), max_cluster_size)]
+            if len(group):
+                groups.extend(self._split_cluster(group, coords, max_cluster_size))
+        
+        return groups
+    
     def _calculate_cluster_center(self, cluster: List[DeliveryOrder]) -> Tuple[float, float]:
         """Calculate the geographical center of a cluster"""
         if not cluster:
@@ -198,36 +382,20 @@ class SmartPackingSystem:
     
     def optimize_loading_sequence(self, orders: List[DeliveryOrder]) -> List[DeliveryOrder]:
         """Optimize the loading sequence for a set of orders"""
-        # Priority-based sorting with multiple criteria
-        def sort_key(order: DeliveryOrder):
-            priority_weight = order.priority.value
-            
-            # Time window urgency (earlier deadlines first)
-            time_urgency = order.time_window[1].timestamp()
-            
-            # Distance from depot (closer deliveries loaded last for easy access)
-            distance_from_depot = self.calculate_distance(
-                self.depot_location, order.customer_location
-            )
-            
-            # Package handling complexity (fragile/special items loaded carefully)
-            handling_complexity = sum(
-                1 for pkg in order.packages 
-                if pkg.fragile or pkg.temperature_sensitive or pkg.hazardous
-            )
-            
-            # Size and weight (heavier items loaded first, at the bottom)
-            size_weight = order.total_weight + (order.total_volume / 1000)  # Normalize volume
-            
-            return (
-                priority_weight,           # Primary: Priority
-                time_urgency,             # Secondary: Time urgency
-                -size_weight,             # Tertiary: Heavier items first (negative for reverse)
-                handling_complexity,      # Quaternary: Special handling
-                distance_from_depot       # Quinary: Distance (closer last)
-            )
+        idx = self._order_indices(orders)
+        
+        # Sort columns, gathered from the per-order arrays
+        priority_weight = self._priorities[idx]                          # Primary: Priority
+        time_urgency = self._deadlines[idx]                              # Secondary: Time urgency
+        size_weight = self._weights[idx] + self._volumes[idx] / 1000     # Tertiary: Heavier items first
+        handling_complexity = self._handling_counts[idx]                 # Quaternary: Special handling
+        distance_from_depot = self._d_depot[idx]                         # Quinary: Distance (closer last)
+        
+        # np.lexsort treats the last key as primary
+        sequence = np.lexsort((distance_from_depot, handling_complexity, -size_weight,
+                               time_urgency, priority_weight))
         
-        return sorted(orders, key=sort_key)
+        return [orders[i] for i in sequence]
     
     def create_loading_plan(self, vehicle: Vehicle, orders: List[DeliveryOrder]) -> Dict:
         """Create detailed loading plan for a vehicle"""
@@ -237,31 +405,34 @@ class SmartPackingSystem:
         # Optimize loading sequence
         optimized_orders = self.optimize_loading_sequence(compatible_orders)
         
+        # Order weights and volumes in one pass; running totals via cumsum
+        n = len(optimized_orders)
+        weights = np.fromiter((order.total_weight for order in optimized_orders), dtype=np.float64, count=n)
+        volumes = np.fromiter((order.total_volume for order in optimized_orders), dtype=np.float64, count=n)
+        cumulative_weights = np.cumsum(weights)
+        cumulative_volumes = np.cumsum(volumes)
+        total_weight = float(cumulative_weights[-1]) if n else 0
+        total_volume = float(cumulative_volumes[-1]) if n else 0
+        
         # Create detailed loading instructions
         loading_plan = {
             'vehicle_id': vehicle.vehicle_id,
             'driver_id': vehicle.driver_id,
-            'total_orders': len(optimized_orders),
-            'total_weight': sum(order.total_weight for order in optimized_orders),
-            'total_volume': sum(order.total_volume for order in optimized_orders),
+            'total_orders': n,
+            'total_weight': total_weight,
+            'total_volume': total_volume,
             'capacity_utilization': {
-                'weight': sum(order.total_weight for order in optimized_orders) / vehicle.capacity_weight * 100,
-                'volume': sum(order.total_volume for order in optimized_orders) / vehicle.capacity_volume * 100
+                'weight': total_weight / vehicle.capacity_weight * 100,
+                'volume': total_volume / vehicle.capacity_volume * 100
             },
             'loading_sequence': [],
             'special_instructions': []
         }
         
         # Generate loading sequence with detailed instructions
-        current_weight = 0
-        current_volume = 0
-        
         for i, order in enumerate(optimized_orders):
-            current_weight += order.total_weight
-            current_volume += order.total_volume
-            
             # Determine loading zone based on delivery sequence
-            loading_zone = self._determine_loading_zone(i, len(optimized_orders))
+            loading_zone = self._determine_loading_zone(i, n)
             
             # Create package-level instructions
             package_instructions = []
@@ -286,8 +457,8 @@ class SmartPackingSystem:
                 'order_weight': order.total_weight,
                 'order_volume': order.total_volume,
                 'packages': package_instructions,
-                'cumulative_weight': current_weight,
-                'cumulative_volume': current_volume,
+                'cumulative_weight': float(cumulative_weights[i]),
+                'cumulative_volume': float(cumulative_volumes[i]),
                 'special_requirements': order.special_instructions
             }
             
@@ -315,39 +486,25 @@ class SmartPackingSystem:
     
     def _get_handling_instructions(self, package: Package) -> List[str]:
         """Generate handling instructions for a package"""
-        instructions = []
-        
-        if package.fragile:
-            instructions.append("FRAGILE - Handle with care")
-        if package.temperature_sensitive:
-            instructions.append("TEMPERATURE SENSITIVE - Keep cool")
-        if package.hazardous:
-            instructions.append("HAZARDOUS - Follow safety protocols")
-        if package.weight > 20:
-            instructions.append("HEAVY - Use proper lifting technique")
-        if max(package.dimensions) > 100:
-            instructions.append("OVERSIZED - May require team lift")
+        mask = (package._flags |
+                (HEAVY_FLAG if package.weight > 20 else 0) |
+                (OVERSIZED_FLAG if package._max_dim > 100 else 0))
         
-        return instructions
+        return list(_HANDLING_TABLE[mask])
     
     def _get_special_handling_note(self, order: DeliveryOrder) -> str:
         """Generate special handling note for an order"""
-        notes = []
-        
-        for pkg in order.packages:
-            if pkg.fragile:
-                notes.append("Contains fragile items")
-            if pkg.temperature_sensitive:
-                notes.append("Requires temperature control")
-            if pkg.hazardous:
-                notes.append("Contains hazardous materials")
-        
-        return "; ".join(set(notes))  # Remove duplicates
+        # req_mask already ORs the flags of every package, so each note appears once
+        return _SPECIAL_NOTE_TABLE[order.req_mask]
     
     def generate_master_packing_plan(self) -> Dict:
         """Generate complete packing plan for all orders and vehicles"""
-        # Sort orders by priority and time constraints
-        sorted_orders = sorted(self.orders, key=lambda x: (x.priority.value, x.time_window[1]))
+        # Precompute coordinates, depot distances and per-order arrays once for every order
+        self._cache_orders(self.orders)
+        
+        # Sort orders by priority and time constraints, using key tuples built once from the arrays
+        keys = list(zip(self._priorities.tolist(), self._deadlines.tolist()))
+        sorted_orders = [self.orders[i] for i in sorted(range(len(keys)), key=keys.__getitem__)]
         
         # Create geographical clusters
         clusters = self.create_geographical_clusters(sorted_orders)
@@ -359,35 +516,21 @@ class SmartPackingSystem:
         # Sort vehicles by capacity (largest first for efficiency)
         sorted_vehicles = sorted(self.vehicles, key=lambda v: v.capacity_weight, reverse=True)
         
+        # Orders each vehicle can handle, one vectorized predicate per vehicle
+        compatibility = {id(vehicle): self._compatibility_mask(vehicle) for vehicle in sorted_vehicles}
+        cluster_positions = [self._order_indices(cluster) for cluster in clusters]
+        
+        if linear_sum_assignment is not None:
+            cluster_vehicles = self._assign_vehicles_optimal(cluster_positions, sorted_vehicles, compatibility)
+        else:
+            cluster_vehicles = self._assign_vehicles_greedy(cluster_positions, sorted_vehicles, compatibility)
+        
         for cluster_idx, cluster in enumerate(clusters):
-            best_vehicle = None
-            best_utilization = 0
-            
-            # Find best vehicle for this cluster
-            for vehicle in sorted_vehicles:
-                if vehicle in [va['vehicle'] for va in vehicle_assignments]:
-                    continue  # Vehicle already assigned
-                
-                compatible_orders = [order for order in cluster if vehicle.can_handle_order(order)]
-                if not compatible_orders:
-                    continue
-                
-                # Calculate utilization efficiency
-                total_weight = sum(order.total_weight for order in compatible_orders)
-                total_volume = sum(order.total_volume for order in compatible_orders)
-                
-                weight_util = total_weight / vehicle.capacity_weight
-                volume_util = total_volume / vehicle.capacity_volume
-                
-                # Prefer balanced utilization
-                utilization_score = min(weight_util, volume_util) * 100
-                
-                if utilization_score > best_utilization and utilization_score <= 100:
-                    best_utilization = utilization_score
-                    best_vehicle = vehicle
+            best_vehicle = cluster_vehicles.get(cluster_idx)
             
             if best_vehicle:
-                compatible_orders = [order for order in cluster if best_vehicle.can_handle_order(order)]
+                compatible_mask = compatibility[id(best_vehicle)][cluster_positions[cluster_idx]]
+                compatible_orders = [order for order, ok in zip(cluster, compatible_mask) if ok]
                 loading_plan = self.create_loading_plan(best_vehicle, compatible_orders)
                 
                 vehicle_assignments.append({
@@ -438,6 +581,83 @@ class SmartPackingSystem:
         self.packing_plans = master_plan
         return master_plan
     
+    def _utilization_scores(self, cluster_positions: List[np.ndarray], vehicles: List[Vehicle],
+                            compatibility: Dict[int, np.ndarray]) -> np.ndarray:
+        """Balanced utilization score (%) of every cluster on every vehicle; NaN where no order fits"""
+        labels = np.full(len(self.orders), -1, dtype=np.intp)
+        for cluster_idx, positions in enumerate(cluster_positions):
+            labels[positions] = cluster_idx
+        
+        n_clusters = len(cluster_positions)
+        scores = np.full((n_clusters, len(vehicles)), np.nan)
+        
+        for v, vehicle in enumerate(vehicles):
+            # Per-cluster totals of the compatible orders in one bincount each
+            mask = compatibility[id(vehicle)] & (labels >= 0)
+            weights = np.bincount(labels[mask], weights=self._weights[mask], minlength=n_clusters)
+            volumes = np.bincount(labels[mask], weights=self._volumes[mask], minlength=n_clusters)
+            counts = np.bincount(labels[mask], minlength=n_clusters)
+            
+            # Prefer balanced utilization
+            utilization = np.minimum(weights / vehicle.capacity_weight, volumes / vehicle.capacity_volume) * 100
+            scores[:, v] = np.where(counts > 0, utilization, np.nan)
+        
+        return scores
+    
+    def _assign_vehicles_optimal(self, cluster_positions: List[np.ndarray], vehicles: List[Vehicle],
+                                 compatibility: Dict[int, np.ndarray]) -> Dict[int, Vehicle]:
+        """Match clusters to vehicles maximizing total utilization score (Hungarian algorithm)"""
+        if not cluster_positions or not vehicles:
+            return {}
+        
+        scores = self._utilization_scores(cluster_positions, vehicles, compatibility)
+        feasible = (scores > 0) & (scores <= 100)
+        
+        # Infeasible pairs get a cost larger than any total score so they are only used as filler
+        cost = np.where(feasible, -scores, 100.0 * len(cluster_positions) + 1)
+        rows, cols = linear_sum_assignment(cost)
+        
+        return {int(c): vehicles[v] for c, v in zip(rows, cols) if feasible[c, v]}
+    
+    def _assign_vehicles_greedy(self, cluster_positions: List[np.ndarray], vehicles: List[Vehicle],
+                                compatibility: Dict[int, np.ndarray]) -> Dict[int, Vehicle]:
+        """Give each cluster in turn the free vehicle with the best utilization score"""
+        cluster_vehicles = {}
+        assigned_vehicle_ids = set()
+        
+        for cluster_idx, positions in enumerate(cluster_positions):
+            best_vehicle = None
+            best_utilization = 0
+            
+            # Find best vehicle for this cluster
+            for vehicle in vehicles:
+                if vehicle.vehicle_id in assigned_vehicle_ids:
+                    continue  # Vehicle already assigned
+                
+                compatible_idx = positions[compatibility[id(vehicle)][positions]]
+                if not len(compatible_idx):
+                    continue
+                
+                # Calculate utilization efficiency
+                total_weight = self._weights[compatible_idx].sum()
+                total_volume = self._volumes[compatible_idx].sum()
+                
+                weight_util = total_weight / vehicle.capacity_weight
+                volume_util = total_volume / vehicle.capacity_volume
+                
+                # Prefer balanced utilization
+                utilization_score = min(weight_util, volume_util) * 100
+                
+                if utilization_score > best_utilization and utilization_score <= 100:
+                    best_utilization = utilization_score
+                    best_vehicle = vehicle
+            
+            if best_vehicle:
+                cluster_vehicles[cluster_idx] = best_vehicle
+                assigned_vehicle_ids.add(best_vehicle.vehicle_id)
+        
+        return cluster_vehicles
+    
     def _calculate_optimization_metrics(self, vehicle_assignments: List[Dict]) -> Dict:
         """Calculate optimization metrics for the packing plan"""
         if not vehicle_assignments:
@@ -446,38 +666,31 @@ class SmartPackingSystem:
         total_capacity_weight = sum(va['vehicle'].capacity_weight for va in vehicle_assignments)
         total_capacity_volume = sum(va['vehicle'].capacity_volume for va in vehicle_assignments)
         
-        total_used_weight = sum(
-            sum(order.total_weight for order in va['orders']) 
-            for va in vehicle_assignments
-        )
-        total_used_volume = sum(
-            sum(order.total_volume for order in va['orders']) 
-            for va in vehicle_assignments
-        )
+        # Positions of all assigned orders, vehicle by vehicle (routes without orders are skipped)
+        routes = [self._order_indices(va['orders']) for va in vehicle_assignments if va['orders']]
+        positions = np.concatenate(routes) if routes else np.empty(0, dtype=np.intp)
+        
+        total_used_weight = float(self._weights[positions].sum())
+        total_used_volume = float(self._volumes[positions].sum())
         
         # Calculate priority distribution
-        priority_distribution = defaultdict(int)
-        for va in vehicle_assignments:
-            for order in va['orders']:
-                priority_distribution[order.priority.name] += 1
+        counts = np.bincount(self._priorities[positions], minlength=len(Priority) + 1)
+        priority_distribution = {priority.name: int(counts[priority.value]) for priority in Priority if counts[priority.value]}
         
-        # Calculate average distance per route
+        # Calculate average distance per route, one segment per vehicle
         avg_distances = []
-        for va in vehicle_assignments:
-            if va['orders']:
-                distances = [
-                    self.calculate_distance(self.depot_location, order.customer_location)
-                    for order in va['orders']
-                ]
-                avg_distances.append(sum(distances) / len(distances))
+        if routes:
+            lengths = np.array([len(route) for route in routes])
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            avg_distances = np.add.reduceat(self._d_depot[positions], offsets) / lengths
         
         return {
             'capacity_utilization': {
                 'weight_percentage': (total_used_weight / total_capacity_weight * 100) if total_capacity_weight > 0 else 0,
                 'volume_percentage': (total_used_volume / total_capacity_volume * 100) if total_capacity_volume > 0 else 0
             },
-            'priority_distribution': dict(priority_distribution),
-            'average_delivery_distance_km': sum(avg_distances) / len(avg_distances) if avg_distances else 0,
+            'priority_distribution': priority_distribution,
+            'average_delivery_distance_km': float(np.mean(avg_distances)) if len(avg_distances) else 0,
             'load_balancing_score': self._calculate_load_balance_score(vehicle_assignments)
         }
     
@@ -486,56 +699,54 @@ class SmartPackingSystem:
         if not vehicle_assignments:
             return 0
         
-        utilizations = []
-        for va in vehicle_assignments:
-            total_weight = sum(order.total_weight for order in va['orders'])
-            utilization = total_weight / va['vehicle'].capacity_weight
-            utilizations.append(utilization)
-        
         # Calculate coefficient of variation (lower is better balanced)
-        if len(utilizations) < 2:
+        if len(vehicle_assignments) < 2:
             return 100
         
-        mean_util = sum(utilizations) / len(utilizations)
-        variance = sum((u - mean_util) ** 2 for u in utilizations) / len(utilizations)
-        std_dev = math.sqrt(variance)
+        utilizations = np.fromiter(
+            (self._weights[self._order_indices(va['orders'])].sum() / va['vehicle'].capacity_weight
+             for va in vehicle_assignments),
+            dtype=np.float64, count=len(vehicle_assignments)
+        )
         
-        cv = (std_dev / mean_util) if mean_util > 0 else 0
+        mean_util = utilizations.mean()
+        cv = (utilizations.std(ddof=0) / mean_util) if mean_util > 0 else 0
         
         # Convert to score (100 = perfect balance, 0 = very unbalanced)
         balance_score = max(0, 100 - (cv * 100))
-        return balance_score
+        return float(balance_score)
+    
+    def _local_distance_matrix(self, coords: np.ndarray) -> np.ndarray:
+        """Equirectangular distances (km) between nearby points, accurate within a cluster"""
+        coslat0 = math.cos(math.radians(coords[:, 0].mean()))
+        return _equirectangular_km(coords[None, :, 0] - coords[:, None, 0],
+                                   coords[None, :, 1] - coords[:, None, 1], coslat0)
     
     def _generate_route_suggestions(self, orders: List[DeliveryOrder]) -> Dict:
         """Generate route optimization suggestions for a set of orders"""
         if not orders:
             return {}
         
-        # Calculate total distance if delivered in current order
-        current_distance = 0
-        current_location = self.depot_location
-        
-        for order in orders:
-            current_distance += self.calculate_distance(current_location, order.customer_location)
-            current_location = order.customer_location
-        
-        # Add return to depot
-        current_distance += self.calculate_distance(current_location, self.depot_location)
+        # Legs inside the cluster are short, so the flat-earth approximation is enough;
+        # only the depot legs use full Haversine
+        idx = self._order_indices(orders)
+        coords = self._order_coords[idx]
+        coslat0 = math.cos(math.radians(coords[:, 0].mean()))
         
-        # Simple nearest neighbor optimization
-        optimized_order = self._nearest_neighbor_route(orders)
-        optimized_distance = 0
-        current_location = self.depot_location
+        # Calculate total distance if delivered in current order (consecutive legs via np.diff)
+        legs = _equirectangular_km(np.diff(coords[:, 0]), np.diff(coords[:, 1]), coslat0)
+        current_distance = float(self._d_depot[idx[0]] + legs.sum() + self._d_depot[idx[-1]])
         
-        for order in optimized_order:
-            optimized_distance += self.calculate_distance(current_location, order.customer_location)
-            current_location = order.customer_location
-        
-        optimized_distance += self.calculate_distance(current_location, self.depot_location)
+        if len(orders) <= 2:
+            # Both directions cover the same legs, nothing to optimize
+            route, optimized_distance = np.arange(len(orders)), current_distance
+        else:
+            # Simple nearest neighbor optimization
+            route, optimized_distance = self._nearest_neighbor_route(orders)
         
         return {
             'original_sequence': [order.order_id for order in orders],
-            'optimized_sequence': [order.order_id for order in optimized_order],
+            'optimized_sequence': [orders[i].order_id for i in route],
             'distance_improvement': {
                 'original_km': current_distance,
                 'optimized_km': optimized_distance,
@@ -545,26 +756,37 @@ class SmartPackingSystem:
             'estimated_time_savings_minutes': (current_distance - optimized_distance) * 2  # Assume 2 min per km
         }
     
-    def _nearest_neighbor_route(self, orders: List[DeliveryOrder]) -> List[DeliveryOrder]:
-        """Simple nearest neighbor algorithm for route optimization"""
+    def _nearest_neighbor_route(self, orders: List[DeliveryOrder]) -> Tuple[np.ndarray, float]:
+        """Simple nearest neighbor route: visiting order (positions in orders) and round-trip distance in km"""
         if not orders:
-            return []
+            return np.empty(0, dtype=np.intp), 0.0
+        
+        idx = self._order_indices(orders)
         
-        unvisited = orders.copy()
-        route = []
-        current_location = self.depot_location
+        # Haversine from the depot for the first stop, equirectangular between stops
+        local_distances = self._local_distance_matrix(self._order_coords[idx])
         
-        while unvisited:
-            nearest_order = min(
-                unvisited,
-                key=lambda order: self.calculate_distance(current_location, order.customer_location)
-            )
+        if _fast is not None:
+            route, total_distance = _fast.nn_route(self._d_depot[idx], local_distances)
+            return route, float(total_distance)
+        
+        visited = np.zeros(len(orders), dtype=bool)
+        route = np.empty(len(orders), dtype=np.intp)
+        row = self._d_depot[idx]
+        
+        for step in range(len(orders)):
+            # Closest unvisited order in a single masked reduction
+            masked = np.where(visited, np.inf, row)
+            nxt = int(np.argmin(masked))
             
-            route.append(nearest_order)
-            unvisited.remove(nearest_order)
-            current_location = nearest_order.customer_location
+            route[step] = nxt
+            visited[nxt] = True
+            row = local_distances[nxt]
         
-        return route
+        # Route length in one gather: depot -> first, consecutive legs, last -> depot
+        total_distance = (self._d_depot[idx[route[0]]] + local_distances[route[:-1], route[1:]].sum()
+                          + self._d_depot[idx[route[-1]]])
+        return route, float(total_distance)
     
     def export_loading_instructions(self, format_type: str = "detailed") -> str:
         """Export loading instructions in various formats"""
@@ -582,63 +804,74 @@ class SmartPackingSystem:
     
     def _export_detailed_instructions(self) -> str:
         """Export detailed loading instructions"""
-        instructions = []
-        instructions.append("=== SMART PACKING SYSTEM - DETAILED LOADING INSTRUCTIONS ===")
-        instructions.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        instructions.append(f"Total Orders: {self.packing_plans['summary']['total_orders']}")
-        instructions.append(f"Assignment Rate: {self.packing_plans['summary']['assignment_rate']:.1f}%")
-        instructions.append("")
+        buf = io.StringIO()
+        w = buf.write
+        
+        # Pre-bound formats for the per-order and per-package lines
+        fmt_order = "{:2d}. ORDER {} - {}\n".format
+        fmt_priority = "    Priority: {} | Zone: {}\n".format
+        fmt_window = "    Time Window: {}\n".format
+        fmt_load = "    Weight: {:.1f}kg | Volume: {:.0f}cm³\n".format
+        fmt_packages = "    Packages: {}\n".format
+        fmt_package = "      - {}: {:.1f}kg\n".format
+        
+        w("=== SMART PACKING SYSTEM - DETAILED LOADING INSTRUCTIONS ===\n")
+        w(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        w(f"Total Orders: {self.packing_plans['summary']['total_orders']}\n")
+        w(f"Assignment Rate: {self.packing_plans['summary']['assignment_rate']:.1f}%\n")
+        w("\n")
         
         for assignment in self.packing_plans['vehicle_assignments']:
-            instructions.append(f"VEHICLE: {assignment['vehicle_id']} | DRIVER: {assignment['driver_id']}")
-            instructions.append(f"Cluster: {assignment['cluster_id']}")
-            instructions.append(f"Orders: {assignment['assigned_orders_count']}")
-            instructions.append("")
+            w(f"VEHICLE: {assignment['vehicle_id']} | DRIVER: {assignment['driver_id']}\n")
+            w(f"Cluster: {assignment['cluster_id']}\n")
+            w(f"Orders: {assignment['assigned_orders_count']}\n")
+            w("\n")
             
             loading_plan = assignment['loading_plan']
-            instructions.append("LOADING SEQUENCE:")
-            instructions.append("-" * 80)
+            w("LOADING SEQUENCE:\n")
+            w("-" * 80 + "\n")
             
             for seq in loading_plan['loading_sequence']:
-                instructions.append(f"{seq['sequence']:2d}. ORDER {seq['order_id']} - {seq['customer_id']}")
-                instructions.append(f"    Priority: {seq['priority']} | Zone: {seq['loading_zone']}")
-                instructions.append(f"    Time Window: {seq['time_window']}")
-                instructions.append(f"    Weight: {seq['order_weight']:.1f}kg | Volume: {seq['order_volume']:.0f}cm³")
-                instructions.append(f"    Packages: {seq['total_packages']}")
+                w(fmt_order(seq['sequence'], seq['order_id'], seq['customer_id']))
+                w(fmt_priority(seq['priority'], seq['loading_zone']))
+                w(fmt_window(seq['time_window']))
+                w(fmt_load(seq['order_weight'], seq['order_volume']))
+                w(fmt_packages(seq['total_packages']))
                 
                 for pkg in seq['packages']:
-                    instructions.append(f"      - {pkg['package_id']}: {pkg['weight']:.1f}kg")
+                    w(fmt_package(pkg['package_id'], pkg['weight']))
                     if pkg['handling']:
-                        instructions.append(f"        Instructions: {', '.join(pkg['handling'])}")
+                        w(f"        Instructions: {', '.join(pkg['handling'])}\n")
                 
                 if seq['special_requirements']:
-                    instructions.append(f"    Special: {seq['special_requirements']}")
-                instructions.append("")
+                    w(f"    Special: {seq['special_requirements']}\n")
+                w("\n")
             
             # Add capacity utilization
             util = loading_plan['capacity_utilization']
-            instructions.append(f"CAPACITY UTILIZATION:")
-            instructions.append(f"Weight: {util['weight']:.1f}% | Volume: {util['volume']:.1f}%")
-            instructions.append("")
+            w("CAPACITY UTILIZATION:\n")
+            w(f"Weight: {util['weight']:.1f}% | Volume: {util['volume']:.1f}%\n")
+            w("\n")
             
             # Add route optimization
             route_opt = assignment['route_optimization']
             if route_opt:
-                instructions.append(f"ROUTE OPTIMIZATION:")
-                instructions.append(f"Distance Savings: {route_opt['distance_improvement']['savings_km']:.1f}km")
-                instructions.append(f"Time Savings: {route_opt['estimated_time_savings_minutes']:.0f} minutes")
-                instructions.append("")
+                w("ROUTE OPTIMIZATION:\n")
+                w(f"Distance Savings: {route_opt['distance_improvement']['savings_km']:.1f}km\n")
+                w(f"Time Savings: {route_opt['estimated_time_savings_minutes']:.0f} minutes\n")
+                w("\n")
             
-            instructions.append("=" * 80)
-            instructions.append("")
+            w("=" * 80 + "\n")
+            w("\n")
         
         if self.packing_plans['unassigned_orders']:
-            instructions.append("UNASSIGNED ORDERS:")
+            w("UNASSIGNED ORDERS:\n")
             for order_id in self.packing_plans['unassigned_orders']:
-                instructions.append(f"- {order_id}")
-            instructions.append("")
+                w(f"- {order_id}\n")
+            w("\n")
         
-        return "\n".join(instructions)
+        # Lines were written newline-terminated; drop the final one to match "\n".join output
+        return buf.getvalue()[:-1]
     
     def _export_summary_instructions(self) -> str:
         """Export summary loading instructions"""
@@ -665,22 +898,26 @@ class SmartPackingSystem:
     
     def _export_driver_sheets(self) -> str:
         """Export individual driver instruction sheets"""
-        sheets = []
+        buf = io.StringIO()
+        w = buf.write
+        
+        # Pre-bound formats for the per-order checklist lines
+        fmt_item = "☐ {}. {} → {}\n".format
+        fmt_packages = "    Packages: {} | Weight: {:.1f}kg\n".format
         
         for assignment in self.packing_plans['vehicle_assignments']:
-            sheet = []
-            sheet.append(f"DRIVER LOADING SHEET")
-            sheet.append(f"Driver: {assignment['driver_id']}")
-            sheet.append(f"Vehicle: {assignment['vehicle_id']}")
-            sheet.append(f"Date: {datetime.now().strftime('%Y-%m-%d')}")
-            sheet.append("")
+            w("DRIVER LOADING SHEET\n")
+            w(f"Driver: {assignment['driver_id']}\n")
+            w(f"Vehicle: {assignment['vehicle_id']}\n")
+            w(f"Date: {datetime.now().strftime('%Y-%m-%d')}\n")
+            w("\n")
             
             loading_plan = assignment['loading_plan']
-            sheet.append("LOADING CHECKLIST:")
+            w("LOADING CHECKLIST:\n")
             
             for seq in loading_plan['loading_sequence']:
-                sheet.append(f"☐ {seq['sequence']}. {seq['order_id']} → {seq['loading_zone']}")
-                sheet.append(f"    Packages: {seq['total_packages']} | Weight: {seq['order_weight']:.1f}kg")
+                w(fmt_item(seq['sequence'], seq['order_id'], seq['loading_zone']))
+                w(fmt_packages(seq['total_packages'], seq['order_weight']))
                 
                 special_handling = []
                 for pkg in seq['packages']:
@@ -688,24 +925,23 @@ class SmartPackingSystem:
                         special_handling.extend(pkg['handling'])
                 
                 if special_handling:
-                    sheet.append(f"    ⚠️  {', '.join(set(special_handling))}")
-                sheet.append("")
-            
-            sheet.append("FINAL CHECK:")
-            sheet.append("☐ All packages loaded according to sequence")
-            sheet.append("☐ Heavy items at bottom, fragile items secure")
-            sheet.append("☐ Easy access items loaded last")
-            sheet.append("☐ All special handling requirements met")
-            sheet.append("")
-            sheet.append("Driver Signature: _________________ Time: _______")
-            sheet.append("")
-            sheet.append("-" * 50)
-            sheet.append("")
+                    w(f"    ⚠️  {', '.join(set(special_handling))}\n")
+                w("\n")
             
-            sheets.extend(sheet)
+            w("FINAL CHECK:\n")
+            w("☐ All packages loaded according to sequence\n")
+            w("☐ Heavy items at bottom, fragile items secure\n")
+            w("☐ Easy access items loaded last\n")
+            w("☐ All special handling requirements met\n")
+            w("\n")
+            w("Driver Signature: _________________ Time: _______\n")
+            w("\n")
+            w("-" * 50 + "\n")
+            w("\n")
         
-        return "\n".join(sheets)
-
+        # Lines were written newline-terminated; drop the final one to match "\n".join output
+        return buf.getvalue()[:-1]
+    
 # Example usage and testing
 def main():
     """Example implementation of the smart packing system"""
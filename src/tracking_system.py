@@ -1,25 +1,223 @@
 import json
+import logging
+import math
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
 import sqlite3
-from dataclasses import dataclass, asdict
-from enum import Enum
-import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-
-class DeliveryStatus(Enum):
-    """Enumeration for delivery status"""
-    PENDING = "pending"
-    PICKED_UP = "picked_up"
-    IN_TRANSIT = "in_transit"
-    OUT_FOR_DELIVERY = "out_for_delivery"
-    DELIVERED = "delivered"
-    FAILED = "failed"
-    RETURNED = "returned"
-
-@dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import IntEnum
+import numpy as np
+
+try:
+    import orjson  # C JSON encoder with native datetime, enum, dataclass and numpy support
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Buffered ingest: queued updates are written every interval, or sooner once this many are waiting
+_FLUSH_INTERVAL_S = 0.1
+_FLUSH_MAX_ROWS = 500
+
+# Column definitions shared by table creation and the schema migration
+_ORDERS_COLUMNS = '''
+    order_id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    customer_email TEXT,
+    customer_phone TEXT,
+    pickup_address TEXT NOT NULL,
+    delivery_address TEXT NOT NULL,
+    created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    scheduled_delivery INTEGER,
+    current_status INTEGER NOT NULL DEFAULT 0 CHECK (current_status BETWEEN 0 AND 6),
+    driver_id TEXT,
+    vehicle_id TEXT,
+    special_instructions TEXT
+'''
+
+_TRACKING_COLUMNS = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    status INTEGER NOT NULL CHECK (status BETWEEN 0 AND 6),
+    latitude REAL,
+    longitude REAL,
+    timestamp INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    message TEXT,
+    driver_id TEXT,
+    accuracy REAL DEFAULT 10.0,
+    FOREIGN KEY (order_id) REFERENCES orders (order_id)
+'''
+
+_NOTIFICATIONS_COLUMNS = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    notification_type TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    sent_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    delivery_status TEXT DEFAULT 'pending',
+    FOREIGN KEY (order_id) REFERENCES orders (order_id)
+'''
+
+# Bump when the schema changes; databases at this PRAGMA user_version skip initialization
+_SCHEMA_VERSION = 1
+
+_SCHEMA_SQL = f'''
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS orders ({_ORDERS_COLUMNS});
+    CREATE TABLE IF NOT EXISTS tracking_updates ({_TRACKING_COLUMNS});
+    CREATE TABLE IF NOT EXISTS notifications ({_NOTIFICATIONS_COLUMNS});
+    
+    -- Indexes for tracking history lookups and date/driver analytics
+    CREATE INDEX IF NOT EXISTS idx_tu_order_ts ON tracking_updates(order_id, timestamp DESC);
+    CREATE INDEX IF NOT EXISTS idx_orders_created_driver ON orders(created_at, driver_id);
+    CREATE INDEX IF NOT EXISTS idx_orders_driver ON orders(driver_id);
+    
+    PRAGMA user_version = {_SCHEMA_VERSION};
+    COMMIT;
+'''
+
+# Hot-path statements, kept as constants so sqlite3's statement cache reuses their prepared form
+
+_SQL_INSERT_ORDER = '''
+    INSERT INTO orders (
+        order_id, customer_id, customer_name, customer_email, 
+        customer_phone, pickup_address, delivery_address, 
+        scheduled_delivery, driver_id, vehicle_id, special_instructions
+    ) VALUES (
+        :order_id, :customer_id, :customer_name, :customer_email, 
+        :customer_phone, :pickup_address, :delivery_address, 
+        :scheduled_delivery, :driver_id, :vehicle_id, :special_instructions
+    )
+'''
+
+_SQL_INSERT_TRACKING = '''
+    INSERT INTO tracking_updates (
+        order_id, status, latitude, longitude, timestamp, 
+        message, driver_id, accuracy
+    ) VALUES (
+        :order_id, :status, :latitude, :longitude, :timestamp, 
+        :message, :driver_id, :accuracy
+    )
+'''
+
+_SQL_UPDATE_ORDER_STATUS = '''
+    UPDATE orders 
+    SET current_status = :status, driver_id = :driver_id
+    WHERE order_id = :order_id
+'''
+
+_SQL_INSERT_NOTIFICATION = '''
+    INSERT INTO notifications (order_id, notification_type, recipient, message)
+    VALUES (:order_id, :notification_type, :recipient, :message)
+'''
+
+# Analytics building blocks: orders created in a date range joined to their last delivery
+# time, exposed as _o either through a temp table or a CTE for the streaming iterators
+_SQL_LAST_DELIVERED_CTE = '''
+    last_delivered AS (
+        SELECT order_id, MAX(timestamp) AS ts
+        FROM tracking_updates
+        WHERE status = :delivered
+        GROUP BY order_id
+    )
+'''
+
+_SQL_ORDERS_IN_RANGE = '''
+    SELECT 
+        orders.order_id,
+        orders.current_status,
+        orders.driver_id,
+        orders.created_at,
+        (last_delivered.ts - orders.created_at) / 3600.0 as delivery_time_hours
+    FROM orders 
+    LEFT JOIN last_delivered USING (order_id)
+    WHERE created_at BETWEEN :start_date AND :end_date
+'''
+
+_SQL_DAILY_TRENDS = '''
+    SELECT 
+        DATE(created_at, 'unixepoch') as delivery_date,
+        COUNT(*) as orders_created,
+        COUNT(CASE WHEN current_status = :delivered THEN 1 END) as orders_delivered
+    FROM _o
+    GROUP BY delivery_date
+    ORDER BY delivery_date
+'''
+
+_SQL_DRIVER_PERFORMANCE = '''
+    SELECT 
+        driver_id,
+        COUNT(*) as total_deliveries,
+        COUNT(CASE WHEN current_status = :delivered THEN 1 END) as successful_deliveries,
+        AVG(CASE WHEN current_status = :delivered THEN delivery_time_hours END) as avg_delivery_time_hours
+    FROM _o
+    WHERE driver_id IS NOT NULL
+    GROUP BY driver_id
+'''
+
+# Simplified ETA model: distance at an average urban speed, padded for traffic
+_TRAFFIC_FACTOR = 1.2      # 20% delay for traffic
+_BASE_TRAVEL_MINUTES = 30  # used when the destination coordinates are unknown
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Haversine distance (km) between two points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    r = 6371  # Earth's radius in kilometers
+    
+    return c * r
+
+def _to_epoch(value: Optional[datetime]) -> Optional[int]:
+    """Datetime as the INTEGER unix-epoch seconds the tables store (range filters and durations become integer math)"""
+    return int(value.timestamp()) if value is not None else None
+
+def _from_epoch(value: Optional[int]) -> Optional[datetime]:
+    """Stored epoch seconds back to a local datetime for API responses"""
+    return datetime.fromtimestamp(value) if value is not None else None
+
+def _json_default(value):
+    """Encode the types orjson handles natively the same way, so the payload does not depend on orjson"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def _dumps(payload) -> str:
+    """Indented JSON for API payloads, encoded by orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str,
+                            option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(payload, indent=2, default=_json_default)
+
+class DeliveryStatus(IntEnum):
+    """Enumeration for delivery status; the integer value is what the database stores"""
+    PENDING = 0
+    PICKED_UP = 1
+    IN_TRANSIT = 2
+    OUT_FOR_DELIVERY = 3
+    DELIVERED = 4
+    FAILED = 5
+    RETURNED = 6
+    
+    @property
+    def label(self) -> str:
+        """Lower-case name used in notifications and API responses"""
+        return self.name.lower()
+
+@dataclass(slots=True)
 class Location:
     """Location data class"""
     latitude: float
@@ -35,7 +233,7 @@ class Location:
             'accuracy': self.accuracy
         }
 
-@dataclass
+@dataclass(slots=True)
 class DeliveryUpdate:
     """Delivery update data class"""
     order_id: str
@@ -48,105 +246,198 @@ class DeliveryUpdate:
     def to_dict(self) -> Dict:
         return {
             'order_id': self.order_id,
-            'status': self.status.value,
+            'status': self.status.label,
             'location': self.location.to_dict(),
             'message': self.message,
             'driver_id': self.driver_id,
             'estimated_delivery_time': self.estimated_delivery_time.isoformat() if self.estimated_delivery_time else None
         }
 
+# Customer-facing message for each status transition
+_STATUS_MESSAGES: Dict[DeliveryStatus, str] = {
+    DeliveryStatus.PICKED_UP: "Your order has been picked up and is being prepared for delivery.",
+    DeliveryStatus.IN_TRANSIT: "Your order is now in transit to the delivery location.",
+    DeliveryStatus.OUT_FOR_DELIVERY: "Your order is out for delivery and will arrive soon!",
+    DeliveryStatus.DELIVERED: "Your order has been successfully delivered. Thank you for your business!",
+    DeliveryStatus.FAILED: "Delivery attempt failed. We will try again or contact you for rescheduling.",
+    DeliveryStatus.RETURNED: "Your order has been returned to the sender. Please contact customer service."
+}
+
+# Progress percentage shown for each stored status code
+_STATUS_PROGRESS: Dict[DeliveryStatus, int] = {
+    DeliveryStatus.PENDING: 0,
+    DeliveryStatus.PICKED_UP: 20,
+    DeliveryStatus.IN_TRANSIT: 40,
+    DeliveryStatus.OUT_FOR_DELIVERY: 80,
+    DeliveryStatus.DELIVERED: 100,
+    DeliveryStatus.FAILED: 0,
+    DeliveryStatus.RETURNED: 0
+}
+
+# Row layout streamed from tracking_updates by get_order_track_arrays
+_TRACK_DTYPE = np.dtype([('lat', np.float64), ('lon', np.float64), ('ts', np.int64), ('status', np.uint8)])
+
+# Stored status code -> label, and label -> code as named SQL parameters
+_STATUS_LABELS: Tuple[str, ...] = tuple(status.label for status in DeliveryStatus)
+_STATUS_PARAMS: Dict[str, int] = {status.label: int(status) for status in DeliveryStatus}
+
 class DeliveryTrackingSystem:
     """Real-time delivery tracking system with notifications and analytics"""
     
-    def __init__(self, db_path: str = "delivery_tracking.db"):
+    def __init__(self, db_path: str = "delivery_tracking.db", avg_speed_kmh: float = 25.0,
+                 buffer_updates: bool = False):
         self.db_path = db_path
+        self.avg_speed_kmh = avg_speed_kmh
+        # order_id -> (delivery lat, lng), or None for orders created without coordinates
+        self._dest_cache: Dict[str, Optional[Tuple[float, float]]] = {}
+        # order_id -> last written (status code, driver_id), to skip no-op order UPDATEs
+        self._last_status: Dict[str, Tuple[int, Optional[str]]] = {}
+        # One connection per thread so concurrent writers never share a transaction
+        self._local = threading.local()
+        self._conns: List[Tuple[threading.Thread, sqlite3.Connection]] = []  # (owning thread, connection)
+        self._conns_lock = threading.Lock()
         self.initialize_database()
         self.notification_handlers = []
         
+        # Optional write buffer: update_delivery_status only queues, a background thread
+        # drains the queue through update_delivery_status_bulk
+        self._buffer: Deque[DeliveryUpdate] = deque()
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # keeps batches committed in arrival order
+        self._flush_wake = threading.Event()
+        self._flush_stop = threading.Event()
+        self._flush_thread = None
+        # Buffered updates that could not be written, with the error each one raised
+        self.dead_letters: List[Tuple[DeliveryUpdate, Exception]] = []
+        if buffer_updates:
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+        
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection (autocommit mode) and apply performance pragmas"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        conn.execute("PRAGMA cache_size=-65536")    # 64 MB
+        conn.row_factory = sqlite3.Row  # C-level mapping rows, converted to dicts only where needed
+        return conn
+    
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self._close_dead_connections()
+            conn = self._local.conn = self._connect()
+            with self._conns_lock:
+                self._conns.append((threading.current_thread(), conn))
+        return conn
+    
+    def _close_dead_connections(self):
+        """Close connections whose owning threads have exited (e.g. finished pool workers)"""
+        with self._conns_lock:
+            alive = []
+            for thread, conn in self._conns:
+                if thread.is_alive():
+                    alive.append((thread, conn))
+                else:
+                    conn.close()
+            self._conns[:] = alive
+    
+    def close(self):
+        """Flush buffered updates and close every thread's database connection"""
+        if self._flush_thread is not None:
+            self._flush_stop.set()
+            self._flush_wake.set()
+            self._flush_thread.join()
+            self._flush_thread = None
+        self.flush()
+        
+        with self._conns_lock:
+            for _, conn in self._conns:
+                conn.close()
+            self._conns.clear()
+            self._local = threading.local()
+    
     def initialize_database(self):
-        """Initialize SQLite database for tracking data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Initialize SQLite database for tracking data (once per database file)"""
+        cursor = self._conn.cursor()
         
-        # Create orders table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                order_id TEXT PRIMARY KEY,
-                customer_id TEXT NOT NULL,
-                customer_name TEXT NOT NULL,
-                customer_email TEXT,
-                customer_phone TEXT,
-                pickup_address TEXT NOT NULL,
-                delivery_address TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                scheduled_delivery TIMESTAMP,
-                current_status TEXT DEFAULT 'pending',
-                driver_id TEXT,
-                vehicle_id TEXT,
-                special_instructions TEXT
-            )
-        ''')
+        if cursor.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            return
         
-        # Create tracking_updates table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tracking_updates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id TEXT NOT NULL,
-                status TEXT NOT NULL,
-                latitude REAL,
-                longitude REAL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                message TEXT,
-                driver_id TEXT,
-                accuracy REAL DEFAULT 10.0,
-                FOREIGN KEY (order_id) REFERENCES orders (order_id)
-            )
-        ''')
+        # Unversioned databases may store statuses as TEXT labels and timestamps as ISO strings;
+        # rebuilding drops their indexes, so this runs before the schema script recreates them
+        self._migrate_schema(cursor)
         
-        # Create notifications table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id TEXT NOT NULL,
-                notification_type TEXT NOT NULL,
-                recipient TEXT NOT NULL,
-                message TEXT NOT NULL,
-                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                delivery_status TEXT DEFAULT 'pending',
-                FOREIGN KEY (order_id) REFERENCES orders (order_id)
-            )
-        ''')
+        cursor.executescript(_SCHEMA_SQL)
+    
+    def _migrate_schema(self, cursor: sqlite3.Cursor):
+        """Rebuild tables whose status/timestamp columns are not INTEGER yet (SQLite cannot alter a column's type)"""
+        to_code = " ".join(f"WHEN '{label}' THEN {code}" for label, code in _STATUS_PARAMS.items())
+        status_columns = ('current_status', 'status')
+        timestamp_columns = ('created_at', 'scheduled_delivery', 'timestamp', 'sent_at')
+        # Written by Python's default adapter from naive local datetimes; the rest came from CURRENT_TIMESTAMP (UTC)
+        local_time_columns = ('scheduled_delivery', 'timestamp')
         
-        conn.commit()
-        conn.close()
+        for table, columns in (('orders', _ORDERS_COLUMNS),
+                               ('tracking_updates', _TRACKING_COLUMNS),
+                               ('notifications', _NOTIFICATIONS_COLUMNS)):
+            info = cursor.execute(f"PRAGMA table_info({table})").fetchall()
+            stale = {col['name'] for col in info
+                     if col['name'] in status_columns + timestamp_columns and col['type'] != 'INTEGER'}
+            if not stale:
+                continue
+            
+            def convert(name: str) -> str:
+                if name not in stale:
+                    return name
+                if name in status_columns:
+                    return f"CASE {name} {to_code} END"
+                # Backfill ISO strings as epoch seconds
+                source = f"{name}, 'utc'" if name in local_time_columns else name
+                return f"CASE WHEN typeof({name}) = 'text' THEN CAST(strftime('%s', {source}) AS INTEGER) ELSE {name} END"
+            
+            select_list = ", ".join(convert(col['name']) for col in info)
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute(f"CREATE TABLE _new_{table} ({columns})")
+                cursor.execute(f"INSERT INTO _new_{table} SELECT {select_list} FROM {table}")
+                cursor.execute(f"DROP TABLE {table}")
+                cursor.execute(f"ALTER TABLE _new_{table} RENAME TO {table}")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
     
     def create_order(self, order_data: Dict) -> str:
         """Create a new delivery order"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO orders (
-                order_id, customer_id, customer_name, customer_email, 
-                customer_phone, pickup_address, delivery_address, 
-                scheduled_delivery, driver_id, vehicle_id, special_instructions
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            order_data['order_id'],
-            order_data['customer_id'],
-            order_data['customer_name'],
-            order_data.get('customer_email'),
-            order_data.get('customer_phone'),
-            order_data['pickup_address'],
-            order_data['delivery_address'],
-            order_data.get('scheduled_delivery'),
-            order_data.get('driver_id'),
-            order_data.get('vehicle_id'),
-            order_data.get('special_instructions')
-        ))
+        cursor.execute(_SQL_INSERT_ORDER, {
+            'order_id': order_data['order_id'],
+            'customer_id': order_data['customer_id'],
+            'customer_name': order_data['customer_name'],
+            'customer_email': order_data.get('customer_email'),
+            'customer_phone': order_data.get('customer_phone'),
+            'pickup_address': order_data['pickup_address'],
+            'delivery_address': order_data['delivery_address'],
+            'scheduled_delivery': _to_epoch(order_data.get('scheduled_delivery')),
+            'driver_id': order_data.get('driver_id'),
+            'vehicle_id': order_data.get('vehicle_id'),
+            'special_instructions': order_data.get('special_instructions')
+        })
         
-        conn.commit()
-        conn.close()
+        # Remember the destination so ETA updates never go back to the database
+        dest_lat = order_data.get('delivery_latitude')
+        dest_lng = order_data.get('delivery_longitude')
+        self._dest_cache[order_data['order_id']] = (
+            (dest_lat, dest_lng) if dest_lat is not None and dest_lng is not None else None
+        )
+        self._last_status[order_data['order_id']] = (int(DeliveryStatus.PENDING), order_data.get('driver_id'))
         
         # Send initial notification
         self.send_notification(
@@ -158,88 +449,200 @@ class DeliveryTrackingSystem:
         return order_data['order_id']
     
     def update_delivery_status(self, update: DeliveryUpdate):
-        """Update delivery status with location and send notifications"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Update delivery status with location and send notifications (queued when buffering)"""
+        if self._flush_thread is None:
+            self.update_delivery_status_bulk([update])
+            return
         
-        # Insert tracking update
-        cursor.execute('''
-            INSERT INTO tracking_updates (
-                order_id, status, latitude, longitude, timestamp, 
-                message, driver_id, accuracy
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            update.order_id,
-            update.status.value,
-            update.location.latitude,
-            update.location.longitude,
-            update.location.timestamp,
-            update.message,
-            update.driver_id,
-            update.location.accuracy
-        ))
+        with self._buffer_lock:
+            self._buffer.append(update)
+            full = len(self._buffer) >= _FLUSH_MAX_ROWS
+        if full:
+            self._flush_wake.set()
+    
+    def flush(self):
+        """Write every queued update in one bulk transaction"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                updates = list(self._buffer)
+                self._buffer.clear()
+            if not updates:
+                return
+            
+            # Only the write is retried; once committed, updates are never replayed
+            written = updates
+            try:
+                self._write_status_updates(updates)
+            except sqlite3.OperationalError:
+                # Transient (e.g. database is locked): requeue the batch ahead of newer updates
+                self._requeue(updates)
+                raise
+            except Exception:
+                # One bad row rolls back the whole batch; write rows singly and dead-letter the bad ones
+                written = []
+                for i, update in enumerate(updates):
+                    try:
+                        self._write_status_updates([update])
+                    except sqlite3.OperationalError:
+                        self._requeue(updates[i:])
+                        self._notify_status_updates_safely(written)
+                        raise
+                    except Exception as exc:
+                        logger.error("Dropping tracking update for order %s: %r", update.order_id, exc)
+                        self.dead_letters.append((update, exc))
+                    else:
+                        written.append(update)
+            self._notify_status_updates_safely(written)
+    
+    def _notify_status_updates_safely(self, updates: List[DeliveryUpdate]):
+        """Notify for committed updates, logging failures instead of raising (a retry would rewrite the rows)"""
+        try:
+            self._notify_status_updates(updates)
+        except Exception:
+            logger.exception("Sending notifications for %d committed tracking updates failed", len(updates))
+    
+    def _requeue(self, updates: List[DeliveryUpdate]):
+        """Put unwritten updates back at the front of the buffer, keeping their order"""
+        with self._buffer_lock:
+            self._buffer.extendleft(reversed(updates))
+    
+    def _flush_loop(self):
+        """Background writer: flush every _FLUSH_INTERVAL_S, or early when the buffer fills"""
+        while not self._flush_stop.is_set():
+            self._flush_wake.wait(_FLUSH_INTERVAL_S)
+            self._flush_wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep ingesting; requeued updates are retried on the next interval
+                logger.exception("Flushing buffered tracking updates failed")
+    
+    def update_delivery_status_bulk(self, updates: List[DeliveryUpdate]):
+        """Apply many status updates in a single transaction, then send their notifications"""
+        if not updates:
+            return
+        
+        self._write_status_updates(updates)
+        self._notify_status_updates(updates)
+    
+    def _write_status_updates(self, updates: List[DeliveryUpdate]):
+        """Insert the tracking rows and apply order status changes in one transaction"""
+        tracking_rows = [
+            {
+                'order_id': update.order_id,
+                'status': int(update.status),
+                'latitude': update.location.latitude,
+                'longitude': update.location.longitude,
+                'timestamp': _to_epoch(update.location.timestamp),
+                'message': update.message,
+                'driver_id': update.driver_id,
+                'accuracy': update.location.accuracy
+            }
+            for update in updates
+        ]
+        
+        # Only rows that change an order's (status, driver) need the UPDATE; GPS-only pings skip it
+        changed = {}
+        status_rows = []
+        for row in tracking_rows:
+            order_id = row['order_id']
+            state = (row['status'], row['driver_id'])
+            if changed.get(order_id, self._last_status.get(order_id)) != state:
+                changed[order_id] = state
+                status_rows.append(row)
+        
+        cursor = self._conn.cursor()
+        
+        # IMMEDIATE takes the write lock up front, so concurrent writers wait instead of failing
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Insert tracking updates
+            cursor.executemany(_SQL_INSERT_TRACKING, tracking_rows)
+            
+            # Update order status (applied in order, so the last update per order wins;
+            # the tracking rows carry every named parameter the UPDATE needs)
+            if status_rows:
+                cursor.executemany(_SQL_UPDATE_ORDER_STATUS, status_rows)
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+        self._last_status.update(changed)
+    
+    def _notify_status_updates(self, updates: List[DeliveryUpdate]):
+        """Send status and ETA notifications for updates that are already committed"""
+        if not updates:
+            return
+        
+        # Calculate ETAs for every in-transit update in one vectorized pass
+        eta_updates = [
+            i for i, update in enumerate(updates)
+            if update.status in (DeliveryStatus.IN_TRANSIT, DeliveryStatus.OUT_FOR_DELIVERY)
+            and update.location and self._is_known_order(update.order_id)
+        ]
+        etas = {}
+        if eta_updates:
+            nan_dest = (np.nan, np.nan)
+            lats = np.array([updates[i].location.latitude for i in eta_updates], dtype=np.float64)
+            lons = np.array([updates[i].location.longitude for i in eta_updates], dtype=np.float64)
+            dests = np.array([self._dest_cache[updates[i].order_id] or nan_dest for i in eta_updates],
+                             dtype=np.float64)
+            minutes = self._eta_batch(lats, lons, dests)
+            
+            now = datetime.now()
+            etas = {i: now + timedelta(minutes=int(m)) for i, m in zip(eta_updates, minutes.tolist())}
         
-        # Update order status
+        notifications = []
+        for i, update in enumerate(updates):
+            # Status notification
+            notifications.append(self._status_notification(update))
+            
+            # ETA notification if in transit
+            if i in etas:
+                notifications.append(self._eta_notification(update.order_id, etas[i]))
+        
+        # Log and send every notification in one batch
+        self.send_notifications_bulk(notifications)
+    
+    def get_order_tracking(self, order_id: str, history_limit: int = 50) -> Dict:
+        """Get tracking information for an order with its latest history_limit updates"""
+        cursor = self._conn.cursor()
+        
+        # Get order details (customer contact columns are only needed for notifications)
         cursor.execute('''
-            UPDATE orders 
-            SET current_status = ?, driver_id = ?
-            WHERE order_id = ?
-        ''', (update.status.value, update.driver_id, update.order_id))
-        
-        conn.commit()
-        conn.close()
-        
-        # Send status notification
-        self.send_status_notification(update)
-        
-        # Calculate ETA if in transit
-        if update.status in [DeliveryStatus.IN_TRANSIT, DeliveryStatus.OUT_FOR_DELIVERY]:
-            eta = self.calculate_eta(update.order_id, update.location)
-            if eta:
-                self.send_eta_notification(update.order_id, eta)
-    
-    def get_order_tracking(self, order_id: str) -> Dict:
-        """Get complete tracking information for an order"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get order details
-        cursor.execute('SELECT * FROM orders WHERE order_id = ?', (order_id,))
+            SELECT order_id, customer_id, customer_name, pickup_address, delivery_address,
+                   created_at, scheduled_delivery, current_status, driver_id, vehicle_id,
+                   special_instructions
+            FROM orders WHERE order_id = ?
+        ''', (order_id,))
         order_row = cursor.fetchone()
         
         if not order_row:
-            conn.close()
             return {"error": "Order not found"}
         
-        # Convert to dictionary
-        order_columns = [desc[0] for desc in cursor.description]
-        order_data = dict(zip(order_columns, order_row))
+        # Convert to dictionary, reporting the status by label and timestamps as datetimes
+        order_data = dict(order_row)
+        status_code = order_data['current_status']
+        order_data['current_status'] = _STATUS_LABELS[status_code]
+        order_data['created_at'] = _from_epoch(order_data['created_at'])
+        order_data['scheduled_delivery'] = _from_epoch(order_data['scheduled_delivery'])
         
-        # Get tracking updates
+        # Get the most recent tracking updates
         cursor.execute('''
-            SELECT * FROM tracking_updates 
+            SELECT latitude, longitude, timestamp, status, accuracy
+            FROM tracking_updates 
             WHERE order_id = ? 
-            ORDER BY timestamp DESC
-        ''', (order_id,))
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', (order_id, history_limit))
         
-        tracking_rows = cursor.fetchall()
-        tracking_columns = [desc[0] for desc in cursor.description]
-        tracking_updates = [dict(zip(tracking_columns, row)) for row in tracking_rows]
-        
-        conn.close()
+        tracking_updates = [dict(row) for row in cursor]
+        for tracking_update in tracking_updates:
+            tracking_update['status'] = _STATUS_LABELS[tracking_update['status']]
+            tracking_update['timestamp'] = _from_epoch(tracking_update['timestamp'])
         
         # Calculate progress percentage
-        status_progress = {
-            'pending': 0,
-            'picked_up': 20,
-            'in_transit': 40,
-            'out_for_delivery': 80,
-            'delivered': 100,
-            'failed': 0,
-            'returned': 0
-        }
-        
-        current_progress = status_progress.get(order_data['current_status'], 0)
+        current_progress = _STATUS_PROGRESS.get(status_code, 0)
         
         # Get latest location
         latest_location = None
@@ -263,89 +666,139 @@ class DeliveryTrackingSystem:
                         datetime.now()) if latest_location else None)
         }
     
-    def calculate_eta(self, order_id: str, current_location: Optional[Location]) -> Optional[datetime]:
-        """Calculate estimated time of arrival based on current location and traffic"""
-        if not current_location:
-            return None
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_order_track_arrays(self, order_id: str) -> Dict[str, np.ndarray]:
+        """Full tracking history as struct-of-arrays (oldest first) for vectorized distance/speed math"""
+        cursor = self._conn.cursor()
+        cursor.execute('''
+            SELECT latitude, longitude, timestamp, status
+            FROM tracking_updates 
+            WHERE order_id = ? 
+            ORDER BY timestamp, id
+        ''', (order_id,))
         
-        # Get delivery address coordinates (simplified - in reality, you'd geocode the address)
-        cursor.execute('SELECT delivery_address FROM orders WHERE order_id = ?', (order_id,))
-        result = cursor.fetchone()
-        conn.close()
+        # Stream plain tuples straight into one record array (no per-row Row objects or list);
+        # missing coordinates become NaN and status holds the DeliveryStatus codes
+        cursor.row_factory = None
+        track = np.fromiter(cursor, dtype=_TRACK_DTYPE)
         
-        if not result:
+        return {
+            'lat': np.ascontiguousarray(track['lat']),
+            'lon': np.ascontiguousarray(track['lon']),
+            'ts': track['ts'].astype('datetime64[s]').astype('datetime64[ms]'),
+            'status': np.ascontiguousarray(track['status'])
+        }
+    
+    def _is_known_order(self, order_id: str) -> bool:
+        """Whether the order exists, caching orders created by another process without coordinates"""
+        if order_id not in self._dest_cache:
+            cursor = self._conn.cursor()
+            cursor.execute('SELECT 1 FROM orders WHERE order_id = ?', (order_id,))
+            if not cursor.fetchone():
+                return False
+            self._dest_cache[order_id] = None
+        return True
+    
+    def calculate_eta(self, order_id: str, current_location: Optional[Location]) -> Optional[datetime]:
+        """Calculate estimated time of arrival based on current location and traffic"""
+        if not current_location or not self._is_known_order(order_id):
             return None
         
         # Simplified ETA calculation
         # In production, you'd use Google Maps API or similar for accurate routing
-        base_travel_time = 30  # minutes
-        traffic_factor = 1.2   # 20% delay for traffic
+        dest = self._dest_cache[order_id]
+        if dest is None:
+            travel_minutes = _BASE_TRAVEL_MINUTES
+        else:
+            distance = _haversine_km(current_location.latitude, current_location.longitude, *dest)
+            travel_minutes = distance / self.avg_speed_kmh * 60
         
-        eta = datetime.now() + timedelta(minutes=int(base_travel_time * traffic_factor))
+        eta = datetime.now() + timedelta(minutes=int(travel_minutes * _TRAFFIC_FACTOR))
         return eta
     
-    def send_notification(self, order_id: str, notification_type: str, message: str):
-        """Send notification to customer"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _eta_batch(self, lats: np.ndarray, lons: np.ndarray, dests: np.ndarray) -> np.ndarray:
+        """Travel minutes (traffic included) from each position to its (lat, lng) destination row; NaN rows are unknown"""
+        lat1, lon1 = np.radians(lats), np.radians(lons)
+        lat2, lon2 = np.radians(dests[:, 0]), np.radians(dests[:, 1])
         
-        # Get customer contact info
-        cursor.execute('''
-            SELECT customer_email, customer_phone, customer_name 
-            FROM orders WHERE order_id = ?
-        ''', (order_id,))
+        a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+        distance = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) * 6371  # Earth's radius in kilometers
         
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
+        travel_minutes = np.where(np.isnan(distance), _BASE_TRAVEL_MINUTES, distance / self.avg_speed_kmh * 60)
+        return travel_minutes * _TRAFFIC_FACTOR
+    
+    def send_notification(self, order_id: str, notification_type: str, message: str):
+        """Send notification to customer"""
+        self.send_notifications_bulk([(order_id, notification_type, message)])
+    
+    def send_notifications_bulk(self, notifications: List[Tuple[str, str, str]]):
+        """Log and send many (order_id, notification_type, message) notifications in one transaction"""
+        if not notifications:
             return
         
-        email, phone, name = result
+        cursor = self._conn.cursor()
         
-        # Log notification
-        if email:
-            cursor.execute('''
-                INSERT INTO notifications (order_id, notification_type, recipient, message)
-                VALUES (?, ?, ?, ?)
-            ''', (order_id, notification_type, email, message))
+        # Get customer contact info once per order
+        contacts = {}
+        for order_id, _, _ in notifications:
+            if order_id not in contacts:
+                cursor.execute('''
+                    SELECT customer_email, customer_phone, customer_name 
+                    FROM orders WHERE order_id = ?
+                ''', (order_id,))
+                contacts[order_id] = cursor.fetchone()
         
-        if phone:
-            cursor.execute('''
-                INSERT INTO notifications (order_id, notification_type, recipient, message)
-                VALUES (?, ?, ?, ?)
-            ''', (order_id, notification_type, phone, message))
+        # Log notifications, one row per available channel
+        params = []
+        for order_id, notification_type, message in notifications:
+            result = contacts[order_id]
+            if not result:
+                continue
+            email, phone, _ = result
+            params.extend(
+                {'order_id': order_id, 'notification_type': notification_type,
+                 'recipient': recipient, 'message': message}
+                for recipient in (email, phone) if recipient
+            )
         
-        conn.commit()
-        conn.close()
+        if params:
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.executemany(_SQL_INSERT_NOTIFICATION, params)
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
         
         # Send actual notifications (email/SMS)
-        if email:
-            self.send_email_notification(email, name, order_id, message)
-        if phone:
-            self.send_sms_notification(phone, message)
+        for order_id, _, message in notifications:
+            result = contacts[order_id]
+            if not result:
+                continue
+            email, phone, name = result
+            if email:
+                self.send_email_notification(email, name, order_id, message)
+            if phone:
+                self.send_sms_notification(phone, message)
+    
+    def _status_notification(self, update: DeliveryUpdate) -> Tuple[str, str, str]:
+        """Build the (order_id, notification_type, message) tuple for a status change"""
+        status = update.status
+        message = _STATUS_MESSAGES.get(status, update.message)
+        return update.order_id, f"status_{status.label}", message
+    
+    def _eta_notification(self, order_id: str, eta: datetime) -> Tuple[str, str, str]:
+        """Build the (order_id, notification_type, message) tuple for an ETA update"""
+        eta_str = eta.strftime("%I:%M %p")
+        message = f"Your order is on the way! Estimated delivery time: {eta_str}"
+        return order_id, "eta_update", message
     
     def send_status_notification(self, update: DeliveryUpdate):
         """Send status-specific notifications"""
-        status_messages = {
-            DeliveryStatus.PICKED_UP: "Your order has been picked up and is being prepared for delivery.",
-            DeliveryStatus.IN_TRANSIT: "Your order is now in transit to the delivery location.",
-            DeliveryStatus.OUT_FOR_DELIVERY: "Your order is out for delivery and will arrive soon!",
-            DeliveryStatus.DELIVERED: "Your order has been successfully delivered. Thank you for your business!",
-            DeliveryStatus.FAILED: "Delivery attempt failed. We will try again or contact you for rescheduling.",
-            DeliveryStatus.RETURNED: "Your order has been returned to the sender. Please contact customer service."
-        }
-        
-        message = status_messages.get(update.status, update.message)
-        self.send_notification(update.order_id, f"status_{update.status.value}", message)
+        self.send_notification(*self._status_notification(update))
     
     def send_eta_notification(self, order_id: str, eta: datetime):
         """Send ETA notification to customer"""
-        eta_str = eta.strftime("%I:%M %p")
-        message = f"Your order is on the way! Estimated delivery time: {eta_str}"
-        self.send_notification(order_id, "eta_update", message)
+        self.send_notification(*self._eta_notification(order_id, eta))
     
     def send_email_notification(self, email: str, name: str, order_id: str, message: str):
         """Send email notification (placeholder implementation)"""
@@ -357,95 +810,87 @@ class DeliveryTrackingSystem:
         print(f"SMS TO {phone}: {message}")
         # In production, implement actual SMS sending with provider API
     
+    def _analytics_params(self, start_date: datetime, end_date: datetime) -> Dict:
+        """Named parameters for the analytics statements"""
+        return {'start_date': _to_epoch(start_date), 'end_date': _to_epoch(end_date), **_STATUS_PARAMS}
+    
+    def _daily_trend_rows(self, cursor: sqlite3.Cursor) -> Iterator[Dict]:
+        """Format daily trend rows as they are read from the cursor"""
+        for row in cursor:
+            yield {
+                'date': row['delivery_date'],
+                'orders_created': row['orders_created'],
+                'orders_delivered': row['orders_delivered']
+            }
+    
+    def _driver_performance_rows(self, cursor: sqlite3.Cursor) -> Iterator[Dict]:
+        """Format driver performance rows as they are read from the cursor"""
+        for row in cursor:
+            yield {
+                'driver_id': row['driver_id'],
+                'total_deliveries': row['total_deliveries'],
+                'successful_deliveries': row['successful_deliveries'],
+                'success_rate': (row['successful_deliveries'] / row['total_deliveries'] * 100) if row['total_deliveries'] > 0 else 0,
+                'avg_delivery_time_hours': row['avg_delivery_time_hours'] or 0
+            }
+    
+    def iter_daily_trends(self, start_date: datetime, end_date: datetime) -> Iterator[Dict]:
+        """Stream daily delivery trends for a date range from a single cursor"""
+        cursor = self._conn.cursor()
+        cursor.execute(f"WITH {_SQL_LAST_DELIVERED_CTE}, _o AS ({_SQL_ORDERS_IN_RANGE}) {_SQL_DAILY_TRENDS}",
+                       self._analytics_params(start_date, end_date))
+        yield from self._daily_trend_rows(cursor)
+    
+    def iter_driver_performance(self, start_date: datetime, end_date: datetime) -> Iterator[Dict]:
+        """Stream per-driver performance for a date range from a single cursor"""
+        cursor = self._conn.cursor()
+        cursor.execute(f"WITH {_SQL_LAST_DELIVERED_CTE}, _o AS ({_SQL_ORDERS_IN_RANGE}) {_SQL_DRIVER_PERFORMANCE}",
+                       self._analytics_params(start_date, end_date))
+        yield from self._driver_performance_rows(cursor)
+    
     def get_delivery_analytics(self, date_range: Tuple[datetime, datetime]) -> Dict:
         """Generate delivery analytics for specified date range"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._conn.cursor()
         
         start_date, end_date = date_range
+        params = self._analytics_params(start_date, end_date)
         
-        # Overall statistics
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_orders,
-                COUNT(CASE WHEN current_status = 'delivered' THEN 1 END) as delivered_orders,
-                COUNT(CASE WHEN current_status = 'failed' THEN 1 END) as failed_orders,
-                AVG(CASE 
-                    WHEN current_status = 'delivered' 
-                    THEN (julianday(
-                        (SELECT timestamp FROM tracking_updates 
-                         WHERE order_id = orders.order_id AND status = 'delivered' 
-                         ORDER BY timestamp DESC LIMIT 1)
-                    ) - julianday(created_at)) * 24
-                END) as avg_delivery_time_hours
-            FROM orders 
-            WHERE created_at BETWEEN ? AND ?
-        ''', (start_date, end_date))
-        
-        stats = cursor.fetchone()
-        
-        # Status distribution
-        cursor.execute('''
-            SELECT current_status, COUNT(*) as count
-            FROM orders 
-            WHERE created_at BETWEEN ? AND ?
-            GROUP BY current_status
-        ''', (start_date, end_date))
-        
-        status_distribution = dict(cursor.fetchall())
+        # Filter orders by date once, joined to their last delivery timestamp;
+        # every aggregate below reads this temp table instead of rescanning orders
+        cursor.execute("DROP TABLE IF EXISTS temp._o")
+        cursor.execute(f"CREATE TEMP TABLE _o AS WITH {_SQL_LAST_DELIVERED_CTE} {_SQL_ORDERS_IN_RANGE}", params)
         
-        # Daily delivery trends
-        cursor.execute('''
-            SELECT 
-                DATE(created_at) as delivery_date,
-                COUNT(*) as orders_created,
-                COUNT(CASE WHEN current_status = 'delivered' THEN 1 END) as orders_delivered
-            FROM orders 
-            WHERE created_at BETWEEN ? AND ?
-            GROUP BY DATE(created_at)
-            ORDER BY delivery_date
-        ''', (start_date, end_date))
-        
-        daily_trends = [
-            {
-                'date': row[0],
-                'orders_created': row[1],
-                'orders_delivered': row[2]
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        # Driver performance
-        cursor.execute('''
-            SELECT 
-                driver_id,
-                COUNT(*) as total_deliveries,
-                COUNT(CASE WHEN current_status = 'delivered' THEN 1 END) as successful_deliveries,
-                AVG(CASE 
-                    WHEN current_status = 'delivered' 
-                    THEN (julianday(
-                        (SELECT timestamp FROM tracking_updates 
-                         WHERE order_id = orders.order_id AND status = 'delivered' 
-                         ORDER BY timestamp DESC LIMIT 1)
-                    ) - julianday(created_at)) * 24
-                END) as avg_delivery_time_hours
-            FROM orders 
-            WHERE created_at BETWEEN ? AND driver_id IS NOT NULL
-            GROUP BY driver_id
-        ''', (start_date, end_date))
-        
-        driver_performance = [
-            {
-                'driver_id': row[0],
-                'total_deliveries': row[1],
-                'successful_deliveries': row[2],
-                'success_rate': (row[2] / row[1] * 100) if row[1] > 0 else 0,
-                'avg_delivery_time_hours': row[3] or 0
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
+        try:
+            # Overall statistics
+            cursor.execute('''
+                SELECT 
+                    COUNT(*) as total_orders,
+                    COUNT(CASE WHEN current_status = :delivered THEN 1 END) as delivered_orders,
+                    COUNT(CASE WHEN current_status = :failed THEN 1 END) as failed_orders,
+                    AVG(CASE WHEN current_status = :delivered THEN delivery_time_hours END) as avg_delivery_time_hours
+                FROM _o
+            ''', _STATUS_PARAMS)
+            
+            stats = cursor.fetchone()
+            
+            # Status distribution
+            cursor.execute('''
+                SELECT current_status, COUNT(*) as count
+                FROM _o
+                GROUP BY current_status
+            ''')
+            
+            status_distribution = {_STATUS_LABELS[row['current_status']]: row['count'] for row in cursor}
+            
+            # Daily delivery trends
+            cursor.execute(_SQL_DAILY_TRENDS, _STATUS_PARAMS)
+            daily_trends = list(self._daily_trend_rows(cursor))
+            
+            # Driver performance
+            cursor.execute(_SQL_DRIVER_PERFORMANCE, _STATUS_PARAMS)
+            driver_performance = list(self._driver_performance_rows(cursor))
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS temp._o")
         
         total_orders, delivered_orders, failed_orders, avg_delivery_time = stats
         
@@ -462,8 +907,8 @@ class DeliveryTrackingSystem:
             'driver_performance': driver_performance
         }
     
-    def simulate_delivery_journey(self, order_id: str, driver_id: str):
-        """Simulate a complete delivery journey for testing"""
+    def simulate_delivery_journey(self, order_id: str, driver_id: str, realtime: bool = False):
+        """Simulate a complete delivery journey for testing; realtime pauses between steps"""
         # Simulate pickup
         pickup_location = Location(19.0760, 72.8777, datetime.now(), 5.0)  # Mumbai depot
         self.update_delivery_status(DeliveryUpdate(
@@ -474,7 +919,8 @@ class DeliveryTrackingSystem:
             driver_id=driver_id
         ))
         
-        time.sleep(2)  # Simulate time passage
+        if realtime:
+            time.sleep(2)  # Simulate time passage
         
         # Simulate in transit
         transit_location = Location(19.0896, 72.8656, datetime.now(), 8.0)  # Bandra
@@ -487,7 +933,8 @@ class DeliveryTrackingSystem:
             estimated_delivery_time=datetime.now() + timedelta(minutes=30)
         ))
         
-        time.sleep(2)
+        if realtime:
+            time.sleep(2)
         
         # Simulate out for delivery
         delivery_location = Location(19.0544, 72.8322, datetime.now(), 3.0)  # Churchgate
@@ -500,7 +947,8 @@ class DeliveryTrackingSystem:
             estimated_delivery_time=datetime.now() + timedelta(minutes=10)
         ))
         
-        time.sleep(2)
+        if realtime:
+            time.sleep(2)
         
         # Simulate delivery
         final_location = Location(19.0544, 72.8322, datetime.now(), 2.0)
@@ -511,6 +959,17 @@ class DeliveryTrackingSystem:
             message="Package successfully delivered",
             driver_id=driver_id
         ))
+    
+    def simulate_delivery_journeys(self, journeys: List[Tuple[str, str]], max_workers: int = 8,
+                                   realtime: bool = False):
+        """Simulate many (order_id, driver_id) journeys concurrently, one connection per worker thread"""
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(
+                lambda journey: self.simulate_delivery_journey(*journey, realtime=realtime), journeys
+            ))
+        
+        # The workers have exited; release their connections instead of holding them until close()
+        self._close_dead_connections()
 
 # Example usage and testing
 def main():
@@ -529,6 +988,8 @@ def main():
             'customer_phone': '+91-9876543210',
             'pickup_address': 'Distribution Center, Mumbai',
             'delivery_address': 'Bandra West, Mumbai',
+            'delivery_latitude': 19.0544,
+            'delivery_longitude': 72.8322,
             'scheduled_delivery': datetime.now() + timedelta(hours=2),
             'driver_id': 'DRV_001',
             'vehicle_id': 'VEH_001'
@@ -541,6 +1002,8 @@ def main():
             'customer_phone': '+91-9876543211',
             'pickup_address': 'Distribution Center, Mumbai',
             'delivery_address': 'Churchgate, Mumbai',
+            'delivery_latitude': 18.9322,
+            'delivery_longitude': 72.8264,
             'scheduled_delivery': datetime.now() + timedelta(hours=3),
             'driver_id': 'DRV_002',
             'vehicle_id': 'VEH_002'
@@ -554,12 +1017,14 @@ def main():
     
     # Simulate delivery journeys
     print("\nSimulating delivery journeys...")
-    tracker.simulate_delivery_journey('ORD_001', 'DRV_001')
+    tracker.simulate_delivery_journeys(
+        [(order['order_id'], order['driver_id']) for order in sample_orders]
+    )
     
     # Get tracking information
     print("\nTracking Information for ORD_001:")
     tracking_info = tracker.get_order_tracking('ORD_001')
-    print(json.dumps(tracking_info, indent=2, default=str))
+    print(_dumps(tracking_info))
     
     # Generate analytics
     print("\nDelivery Analytics:")
@@ -567,7 +1032,7 @@ def main():
         datetime.now() - timedelta(days=7),
         datetime.now()
     ))
-    print(json.dumps(analytics, indent=2, default=str))
+    print(_dumps(analytics))
     
     return tracker
 